@@ -8,46 +8,133 @@ import cv2
 import numpy as np
 from PIL import Image
 import time
-import base64
-from io import BytesIO
 import threading
 
-from hand_tracking import HandTracker
+from hand_tracking import HandTracker, HAND_CONNECTIONS, circle_offsets, scatter_marker
 from gesture_recognition import GestureRecognizer
 from canvas import GestureCanvas
 from style_transfer import StableDiffusionStyleTransfer, STYLE_PRESETS
 from threading_manager import ThreadingManager, GenerationRequest
-from config import GESTURE_THRESHOLDS
+from config import GESTURE_THRESHOLDS, HAND_TRACKING_CONF, TRACK_SIZE, Gesture
 
 # Global state
 app_state = {
     'tracker': None,
     'recognizer': None,
     'canvas': None,
+    'canvas_lock': threading.Lock(),  # Held while drawing or snapshotting the canvas
     'style_transfer': None,
     'threading_manager': None,
     'initialized': False,
     'drawing': False,
-    'last_gesture': "NONE",
+    'last_gesture': Gesture.NONE,
     'clear_hold_start': None,
     'show_tutorial': True,
     'generation_in_progress': False,
-    'latest_styled_image': None
+    'latest_styled_image': None,
+    'model_error': None  # Set if the background model preload fails
 }
 
 # Configuration
 GESTURE_COLORS = {
-    'POINTING': (0, 255, 0),  # Green - Draw
-    'FIST': (255, 0, 0),      # Blue - Stop
-    'OPEN_PALM': (0, 255, 255),  # Yellow - Clear
-    'PINCH': (255, 0, 255),   # Magenta - Undo/Style
-    'NONE': (255, 255, 255)   # White - No gesture
+    Gesture.POINTING: (0, 255, 0),  # Green - Draw
+    Gesture.FIST: (255, 0, 0),      # Blue - Stop
+    Gesture.OPEN_PALM: (0, 255, 255),  # Yellow - Clear
+    Gesture.PINCH: (255, 0, 255),   # Magenta - Undo/Style
+    Gesture.NONE: (255, 255, 255)   # White - No gesture
 }
 
-def encode_image_to_base64(image: np.ndarray) -> str:
-    """Encode image to base64 for HTML display."""
-    _, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, 85])
-    return base64.b64encode(buffer).decode('utf-8')
+# Tutorial panel: (x1, y1, x2, y2) inclusive, and its text lines
+TUTORIAL_RECT = (10, 60, 630, 200)
+TUTORIAL_LINES = [
+    ("GESTURES:", (20, 85), 0.6, (255, 255, 255), 2),
+    ("POINTING (Green) - Draw on canvas", (20, 115), 0.5, (0, 255, 0), 1),
+    ("FIST (Blue) - Stop drawing", (20, 140), 0.5, (255, 0, 0), 1),
+    ("OPEN PALM (Yellow) - Clear (hold 1s)", (20, 165), 0.5, (0, 255, 255), 1),
+    ("PINCH (Magenta) - Undo or Apply Style", (20, 190), 0.5, (255, 0, 255), 1),
+]
+
+
+def _render_text_stamp(lines, width: int, height: int, origin=(0, 0)):
+    """
+    Rasterize text lines once into a blendable stamp.
+    Returns (ys, xs, alpha, color): the covered pixel coordinates, their
+    coverage in [0, 1] and the premultiplied text color at each of them.
+    """
+    ox, oy = origin
+    color_layer = np.zeros((height, width, 3), dtype=np.uint8)
+    coverage = np.zeros((height, width), dtype=np.uint8)
+    for text, (x, y), scale, color, thickness in lines:
+        org = (x - ox, y - oy)
+        cv2.putText(color_layer, text, org, cv2.FONT_HERSHEY_SIMPLEX, scale, color, thickness)
+        cv2.putText(coverage, text, org, cv2.FONT_HERSHEY_SIMPLEX, scale, 255, thickness)
+    ys, xs = np.nonzero(coverage)
+    alpha = coverage[ys, xs, None].astype(np.float32) / 255.0
+    return ys, xs, alpha, color_layer[ys, xs].astype(np.float32)
+
+
+def _blit_stamp(frame: np.ndarray, stamp, x: int, y: int):
+    """Blend a pre-rendered stamp into frame at (x, y), touching only text pixels."""
+    ys, xs, alpha, color = stamp
+    ys = ys + y
+    xs = xs + x
+    keep = (ys < frame.shape[0]) & (xs < frame.shape[1])
+    if not keep.all():
+        ys, xs, alpha, color = ys[keep], xs[keep], alpha[keep], color[keep]
+    blended = frame[ys, xs] * (1.0 - alpha) + color
+    frame[ys, xs] = (blended + 0.5).astype(np.uint8)
+
+
+def _make_placeholder(fill: int, text: str = None) -> np.ndarray:
+    """Build a read-only 640x480 placeholder frame once."""
+    frame = np.full((480, 640, 3), fill, dtype=np.uint8)
+    if text:
+        cv2.putText(frame, text, (50, 240),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
+    frame.setflags(write=False)
+    return frame
+
+
+# Idle frames returned on every tick; callers must .copy() before mutating
+_PLACEHOLDER_FRAME = _make_placeholder(0, "Click 'Initialize System' to start")
+_BLANK_FRAME = _make_placeholder(0)
+_PLACEHOLDER_CANVAS = _make_placeholder(255)
+
+
+# Landmark marker: filled dot with a black ring, drawn as one scatter per layer
+LANDMARK_DOT = circle_offsets(4, -1)
+LANDMARK_RING = circle_offsets(6, 1)
+
+
+_x1, _y1, _x2, _y2 = TUTORIAL_RECT
+TUTORIAL_STAMP = _render_text_stamp(TUTORIAL_LINES, _x2 - _x1 + 1, _y2 - _y1 + 1, origin=(_x1, _y1))
+
+# Gesture label stamps, rendered on first use
+_label_stamps = {}
+
+
+def _gesture_label_stamp(gesture: Gesture):
+    """Get (and cache) the pre-rendered label for a gesture."""
+    stamp = _label_stamps.get(gesture)
+    if stamp is None:
+        (w, h), baseline = cv2.getTextSize(gesture.name, cv2.FONT_HERSHEY_SIMPLEX, 0.8, 2)
+        stamp = _render_text_stamp([(gesture.name, (10, 30), 0.8, GESTURE_COLORS[gesture], 2)],
+                                   10 + w + 4, 30 + baseline + 4)
+        _label_stamps[gesture] = stamp
+    return stamp
+
+
+def preload_style_model():
+    """Load and warm up the SD model, then start the generation thread (runs in background)."""
+    style_transfer = app_state['style_transfer']
+    try:
+        style_transfer.load_model(progress_callback=lambda msg: print(f"[SD] {msg}"))
+        warmup_time = style_transfer.warmup()
+        print(f"[SD] Warmup done in {warmup_time:.1f}s")
+        app_state['threading_manager'].start_generation_thread(style_transfer)
+    except Exception as e:
+        app_state['model_error'] = str(e)
+        print(f"[SD] Model preload failed: {e}")
 
 
 def initialize_system(camera_index=0):
@@ -70,6 +157,9 @@ def initialize_system(camera_index=0):
             camera_index=camera_index
         )
         
+        # Load the SD model off the UI thread so the first generation doesn't stall
+        threading.Thread(target=preload_style_model, daemon=True).start()
+        
         app_state['initialized'] = True
         return "✅ System initialized successfully! Start gesturing to draw."
     
@@ -80,27 +170,25 @@ def initialize_system(camera_index=0):
 def process_frame_with_overlay():
     """Get latest frame with gesture overlays."""
     if not app_state['initialized']:
-        # Return placeholder
-        placeholder = np.zeros((480, 640, 3), dtype=np.uint8)
-        cv2.putText(placeholder, "Click 'Initialize System' to start", (50, 240),
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
-        return placeholder
+        return _PLACEHOLDER_FRAME
     
     # Get latest frame
     frame = app_state['threading_manager'].frame_buffer.get_latest()
     if frame is None:
-        return np.zeros((480, 640, 3), dtype=np.uint8)
+        return _BLANK_FRAME
     
     # Get gesture state
     gesture_state = app_state['threading_manager'].gesture_state.get()
     
     # Draw hand landmarks
-    if gesture_state.hand_detected and gesture_state.hand_landmarks:
+    if gesture_state.hand_detected and gesture_state.hand_landmarks is not None:
         color = GESTURE_COLORS.get(gesture_state.gesture, (255, 255, 255))
+        pts = gesture_state.hand_landmarks
         
-        for lm in gesture_state.hand_landmarks:
-            cv2.circle(frame, (lm['x'], lm['y']), 4, color, -1)
-            cv2.circle(frame, (lm['x'], lm['y']), 6, (0, 0, 0), 1)
+        # Skeleton in one call, then one scatter per marker layer
+        cv2.polylines(frame, pts[HAND_CONNECTIONS], False, color, 1)
+        scatter_marker(frame, pts, LANDMARK_DOT, color)
+        scatter_marker(frame, pts, LANDMARK_RING, (0, 0, 0))
         
         # Draw cursor at index fingertip
         if gesture_state.index_tip_pos:
@@ -111,30 +199,19 @@ def process_frame_with_overlay():
     
     # Gesture feedback border
     gesture = gesture_state.gesture
-    if gesture != "NONE":
+    if gesture != Gesture.NONE:
         color = GESTURE_COLORS[gesture]
         cv2.rectangle(frame, (0, 0), (frame.shape[1]-1, frame.shape[0]-1), color, 5)
     
     # Gesture label
-    cv2.putText(frame, f"{gesture}", (10, 30),
-               cv2.FONT_HERSHEY_SIMPLEX, 0.8, GESTURE_COLORS[gesture], 2)
+    _blit_stamp(frame, _gesture_label_stamp(gesture), 0, 0)
     
-    # Tutorial overlay
+    # Tutorial overlay: darken the panel ROI in place, then blit the pre-rendered text
     if app_state['show_tutorial']:
-        overlay = frame.copy()
-        cv2.rectangle(overlay, (10, 60), (630, 200), (0, 0, 0), -1)
-        cv2.addWeighted(overlay, 0.7, frame, 0.3, 0, frame)
-        
-        cv2.putText(frame, "GESTURES:", (20, 85),
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
-        cv2.putText(frame, "POINTING (Green) - Draw on canvas", (20, 115),
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
-        cv2.putText(frame, "FIST (Blue) - Stop drawing", (20, 140),
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 1)
-        cv2.putText(frame, "OPEN PALM (Yellow) - Clear (hold 1s)", (20, 165),
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 1)
-        cv2.putText(frame, "PINCH (Magenta) - Undo or Apply Style", (20, 190),
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 255), 1)
+        x1, y1, x2, y2 = TUTORIAL_RECT
+        roi = frame[y1:y2 + 1, x1:x2 + 1]
+        cv2.convertScaleAbs(roi, dst=roi, alpha=0.3)
+        _blit_stamp(frame, TUTORIAL_STAMP, x1, y1)
     
     return frame
 
@@ -142,49 +219,50 @@ def process_frame_with_overlay():
 def update_canvas():
     """Update canvas based on gestures."""
     if not app_state['initialized'] or app_state['canvas'] is None:
-        return np.full((480, 640, 3), 255, dtype=np.uint8)
+        return _PLACEHOLDER_CANVAS
     
     gesture_state = app_state['threading_manager'].gesture_state.get()
     h, w = 480, 640
     
-    # Handle drawing
-    if gesture_state.hand_detected and gesture_state.index_tip_pos:
-        gesture = gesture_state.gesture
-        x, y = gesture_state.index_tip_pos
+    with app_state['canvas_lock']:
+        # Handle drawing
+        if gesture_state.hand_detected and gesture_state.index_tip_pos:
+            gesture = gesture_state.gesture
+            x, y = gesture_state.index_tip_pos
         
-        # Transform to canvas coordinates
-        canvas_x, canvas_y = app_state['canvas'].gesture_to_canvas_coords(x, y, (w, h))
+            # Transform to canvas coordinates
+            canvas_x, canvas_y = app_state['canvas'].gesture_to_canvas_coords(x, y, (w, h))
         
-        if gesture == "POINTING":
-            if not app_state['drawing']:
-                app_state['canvas'].start_stroke(canvas_x, canvas_y)
-                app_state['drawing'] = True
-            else:
-                app_state['canvas'].add_point(canvas_x, canvas_y)
-            app_state['clear_hold_start'] = None
+            if gesture == Gesture.POINTING:
+                if not app_state['drawing']:
+                    app_state['canvas'].start_stroke(canvas_x, canvas_y)
+                    app_state['drawing'] = True
+                else:
+                    app_state['canvas'].add_point(canvas_x, canvas_y)
+                app_state['clear_hold_start'] = None
         
-        elif gesture != "POINTING" and app_state['drawing']:
-            app_state['canvas'].end_stroke()
-            app_state['drawing'] = False
+            elif gesture != Gesture.POINTING and app_state['drawing']:
+                app_state['canvas'].end_stroke()
+                app_state['drawing'] = False
         
-        # Handle undo (PINCH)
-        if gesture == "PINCH" and app_state['last_gesture'] != "PINCH":
-            app_state['canvas'].undo()
-            app_state['clear_hold_start'] = None
+            # Handle undo (PINCH)
+            if gesture == Gesture.PINCH and app_state['last_gesture'] != Gesture.PINCH:
+                app_state['canvas'].undo()
+                app_state['clear_hold_start'] = None
         
-        # Handle clear (OPEN_PALM held)
-        if gesture == "OPEN_PALM":
-            if app_state['clear_hold_start'] is None:
-                app_state['clear_hold_start'] = time.time()
-            elif time.time() - app_state['clear_hold_start'] > 1.0:
-                app_state['canvas'].clear()
+            # Handle clear (OPEN_PALM held)
+            if gesture == Gesture.OPEN_PALM:
+                if app_state['clear_hold_start'] is None:
+                    app_state['clear_hold_start'] = time.time()
+                elif time.time() - app_state['clear_hold_start'] > 1.0:
+                    app_state['canvas'].clear()
+                    app_state['clear_hold_start'] = None
+            else:
                 app_state['clear_hold_start'] = None
-        else:
-            app_state['clear_hold_start'] = None
         
-        app_state['last_gesture'] = gesture
+            app_state['last_gesture'] = gesture
     
-    return app_state['canvas'].get_display()
+        return app_state['canvas'].get_display()
 
 
 def generate_styled_image(style: str):
@@ -195,24 +273,26 @@ def generate_styled_image(style: str):
     if app_state['generation_in_progress']:
         return None, "⏳ Generation already in progress..."
     
+    if app_state['model_error']:
+        return None, f"❌ Model failed to load: {app_state['model_error']}"
+    
+    # Generation thread starts once the background preload has finished
+    if app_state['threading_manager'].generation_thread is None:
+        return None, "⏳ Model still loading..."
+    
     try:
-        # Load model if needed
-        if not app_state['style_transfer'].is_loaded:
-            app_state['style_transfer'].load_model(
-                progress_callback=lambda msg: print(f"[SD] {msg}")
-            )
-            
-            # Start generation thread
-            app_state['threading_manager'].start_generation_thread(
-                app_state['style_transfer']
-            )
+        # Snapshot the canvas so later drawing doesn't leak into the result
+        with app_state['canvas_lock']:
+            canvas_image = app_state['canvas'].snapshot()
+            canvas_version = app_state['canvas'].version
         
         # Create request
         request = GenerationRequest(
             request_id=f"req_{int(time.time()*1000)}",
-            canvas_image=app_state['canvas'].get_canvas(),
+            canvas_image=canvas_image,
             style=style,
-            timestamp=time.time()
+            timestamp=time.time(),
+            canvas_version=canvas_version
         )
         
         # Add to queue
@@ -229,9 +309,13 @@ def generate_styled_image(style: str):
 
 
 def check_generation_results():
-    """Check for completed generations (called periodically)."""
+    """
+    Check for completed generations (called periodically).
+    The styled PIL image goes to Gradio as-is; when nothing new has finished,
+    both outputs are left untouched rather than re-sent or cleared.
+    """
     if not app_state['initialized']:
-        return None, ""
+        return gr.update(), gr.update()
     
     try:
         result = app_state['threading_manager'].result_queue.get_nowait()
@@ -244,7 +328,43 @@ def check_generation_results():
             return None, f"❌ Generation failed: {result.error}"
     
     except:
-        return None, ""
+        return gr.update(), gr.update()
+
+
+def stream_frames():
+    """
+    Stream webcam overlay and canvas to the UI as new frames arrive.
+    Waits on the tracking thread's frame_ready event instead of polling on a
+    timer, and skips frames it has already rendered.
+    """
+    yield process_frame_with_overlay(), update_canvas()
+    
+    last_frame_id = 0
+    while True:
+        manager = app_state['threading_manager']
+        if not app_state['initialized'] or manager is None:
+            time.sleep(0.1)
+            continue
+        
+        if not manager.frame_ready.wait(timeout=0.1):
+            continue
+        manager.frame_ready.clear()
+        
+        frame_id = manager.frame_buffer.frame_id
+        if frame_id == last_frame_id:
+            continue
+        last_frame_id = frame_id
+        
+        yield process_frame_with_overlay(), update_canvas()
+
+
+def canvas_action(action: str):
+    """Run a canvas button action and return the refreshed display."""
+    if app_state['canvas'] is None:
+        return _PLACEHOLDER_CANVAS
+    with app_state['canvas_lock']:
+        getattr(app_state['canvas'], action)()
+        return app_state['canvas'].get_display()
 
 
 def update_threshold(threshold_name: str, value: float):
@@ -255,8 +375,23 @@ def update_threshold(threshold_name: str, value: float):
     return f"Unknown threshold: {threshold_name}"
 
 
+def update_tracking(lite_model: bool, downscale: bool):
+    """Toggle the tracker's lite model and downscaled input at runtime."""
+    tracker = app_state['tracker']
+    if tracker is None:
+        return "Initialize the system first"
+    tracker.set_model_complexity(0 if lite_model else 1)
+    tracker.track_size = TRACK_SIZE if downscale else None
+    return (f"✓ Tracking: {'lite' if lite_model else 'full'} model, "
+            f"{'downscaled' if downscale else 'full-res'} input")
+
+
 def build_interface():
-    """Build Gradio interface."""
+    """
+    Build Gradio interface.
+    Components exchange raw numpy frames / PIL images; nothing is JPEG or
+    base64 encoded on our side of the transport.
+    """
     
     with gr.Blocks(title="GestureCanvas - AI-Powered Interactive Art") as app:
         gr.Markdown("# 🎨 GestureCanvas - AI-Powered Interactive Art")
@@ -308,6 +443,16 @@ def build_interface():
                 minimum=1, maximum=20, value=GESTURE_THRESHOLDS['cooldown_frames'],
                 step=1, label="Cooldown Frames (transition delay)"
             )
+            
+            with gr.Row():
+                lite_model_checkbox = gr.Checkbox(
+                    value=HAND_TRACKING_CONF['model_complexity'] == 0,
+                    label="Lite tracking model (faster, slightly less accurate)"
+                )
+                downscale_checkbox = gr.Checkbox(
+                    value=TRACK_SIZE is not None,
+                    label="Downscale tracking input (TRACK_SIZE)"
+                )
         
         # Event handlers
         def toggle_tutorial():
@@ -316,8 +461,9 @@ def build_interface():
         
         init_btn.click(initialize_system, outputs=[status_text])
         tutorial_btn.click(toggle_tutorial, outputs=[status_text])
-        clear_btn.click(lambda: app_state['canvas'].clear() if app_state['canvas'] else None)
-        undo_btn.click(lambda: app_state['canvas'].undo() if app_state['canvas'] else None)
+        # Return the canvas so it refreshes even if no camera frame arrives
+        clear_btn.click(lambda: canvas_action('clear'), outputs=[canvas_display])
+        undo_btn.click(lambda: canvas_action('undo'), outputs=[canvas_display])
         
         generate_btn.click(
             generate_styled_image,
@@ -337,11 +483,17 @@ def build_interface():
             outputs=[status_text]
         )
         
-        # Periodic updates
+        for checkbox in (lite_model_checkbox, downscale_checkbox):
+            checkbox.change(
+                update_tracking,
+                inputs=[lite_model_checkbox, downscale_checkbox],
+                outputs=[status_text]
+            )
+        
+        # Frame-driven updates (paced by the camera, not a timer)
         app.load(
-            lambda: (process_frame_with_overlay(), update_canvas()),
-            outputs=[webcam_display, canvas_display],
-            every=0.033  # ~30 FPS
+            stream_frames,
+            outputs=[webcam_display, canvas_display]
         )
         
         # Check for generation results
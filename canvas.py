@@ -8,6 +8,17 @@ import cv2
 from typing import List, Tuple, Optional
 from dataclasses import dataclass
 import time
+import zlib
+from functools import lru_cache, partial
+
+# Undo region compression: zstd if installed, zlib otherwise
+try:
+    import zstandard
+    _compress = zstandard.ZstdCompressor(level=1).compress
+    _decompress = zstandard.ZstdDecompressor().decompress
+except ImportError:
+    _compress = partial(zlib.compress, level=1)
+    _decompress = zlib.decompress
 
 @dataclass
 class Point:
@@ -16,35 +27,80 @@ class Point:
 
 @dataclass
 class Stroke:
-    points: List[Point]
+    points: np.ndarray  # (N, 2) float32
     color: Tuple[int, int, int]
     thickness: int
     timestamp: float
 
+@dataclass
+class CompressedRegion:
+    """Compressed uint8 pixel region stored in undo history."""
+    blob: bytes
+    shape: Tuple[int, ...]
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.blob)
+
+    def decompress(self) -> np.ndarray:
+        return np.frombuffer(_decompress(self.blob), dtype=np.uint8).reshape(self.shape)
+
+
 class CanvasUndoManager:
     """Efficient undo/redo using diff-based storage."""
     
-    def __init__(self, max_history: int = 50):
+    def __init__(self, max_history: int = 50, compress_threshold: int = 32 * 1024):
         self.max_history = max_history
+        self.compress_threshold = compress_threshold  # Regions larger than this are compressed
         self.history = []  # List of (bbox, diff_data)
         self.redo_stack = []
-    
+        self._diff_buf: Optional[np.ndarray] = None  # Reused comparison mask
+
+    def _pack(self, region: np.ndarray, copy: bool = False):
+        """Compress large regions; small ones are kept as arrays (copied if asked)."""
+        if region.nbytes > self.compress_threshold:
+            return CompressedRegion(_compress(np.ascontiguousarray(region)), region.shape)
+        return region.copy() if copy else region
+
+    @staticmethod
+    def _unpack(data) -> np.ndarray:
+        return data.decompress() if isinstance(data, CompressedRegion) else data
+
+    def _changed_bbox(self, canvas_before: np.ndarray,
+                      canvas_after: np.ndarray) -> Optional[Tuple[int, int, int, int]]:
+        """Bounding box (x1, y1, x2, y2) of differing pixels, or None."""
+        if self._diff_buf is None or self._diff_buf.shape != canvas_before.shape:
+            self._diff_buf = np.empty(canvas_before.shape, dtype=bool)
+        diff = np.not_equal(canvas_before, canvas_after, out=self._diff_buf)
+
+        # Per-axis reductions instead of np.where over the full mask
+        h, w = diff.shape[:2]
+        flat = diff.reshape(h, -1)
+        row_any = flat.any(axis=1)
+        if not row_any.any():
+            return None
+        col_any = flat.any(axis=0).reshape(w, -1).any(axis=1)
+
+        y1 = int(row_any.argmax())
+        y2 = h - int(row_any[::-1].argmax())
+        x1 = int(col_any.argmax())
+        x2 = w - int(col_any[::-1].argmax())
+        return x1, y1, x2, y2
+
     def save_state(self, canvas_before: np.ndarray, canvas_after: np.ndarray):
         """Save only the changed region (diff-based compression)."""
         # Find bounding box of changes
-        diff = np.any(canvas_before != canvas_after, axis=2)
-        if not diff.any():
+        bbox = self._changed_bbox(canvas_before, canvas_after)
+        if bbox is None:
             return  # No changes
-        
-        rows, cols = np.where(diff)
-        y1, y2 = rows.min(), rows.max() + 1
-        x1, x2 = cols.min(), cols.max() + 1
-        
+
         # Store bbox and the diff region
-        bbox = (x1, y1, x2, y2)
-        diff_data = canvas_before[y1:y2, x1:x2].copy()
-        
-        self.history.append((bbox, diff_data))
+        x1, y1, x2, y2 = bbox
+        self.save_region(bbox, canvas_before[y1:y2, x1:x2].copy())
+    
+    def save_region(self, bbox: Tuple[int, int, int, int], region_before: np.ndarray):
+        """Save a known changed region directly, skipping the diff scan."""
+        self.history.append((tuple(bbox), self._pack(region_before)))
         self.redo_stack.clear()  # Clear redo on new action
         
         # Limit history size
@@ -60,10 +116,10 @@ class CanvasUndoManager:
         x1, y1, x2, y2 = bbox
         
         # Save current state to redo stack
-        self.redo_stack.append((bbox, canvas[y1:y2, x1:x2].copy()))
+        self.redo_stack.append((bbox, self._pack(canvas[y1:y2, x1:x2], copy=True)))
         
         # Restore previous state
-        canvas[y1:y2, x1:x2] = diff_data
+        canvas[y1:y2, x1:x2] = self._unpack(diff_data)
         return canvas
     
     def redo(self, canvas: np.ndarray) -> Optional[np.ndarray]:
@@ -75,14 +131,14 @@ class CanvasUndoManager:
         x1, y1, x2, y2 = bbox
         
         # Save to history
-        self.history.append((bbox, canvas[y1:y2, x1:x2].copy()))
+        self.history.append((bbox, self._pack(canvas[y1:y2, x1:x2], copy=True)))
         
         # Restore redo state
-        canvas[y1:y2, x1:x2] = diff_data
+        canvas[y1:y2, x1:x2] = self._unpack(diff_data)
         return canvas
     
     def get_memory_usage(self) -> int:
-        """Calculate approximate memory usage in bytes."""
+        """Calculate approximate memory usage in bytes (compressed size where compressed)."""
         total = 0
         for bbox, data in self.history + self.redo_stack:
             total += data.nbytes
@@ -93,65 +149,66 @@ class CatmullRomSpline:
     """Catmull-Rom spline interpolation for smooth strokes."""
     
     @staticmethod
-    def interpolate(points: List[Point], num_segments: int = 5) -> List[Point]:
-        """Generate smooth curve through points."""
-        if len(points) < 2:
-            return points
+    def interpolate(points, num_segments: int = 5) -> np.ndarray:
+        """
+        Generate smooth curve through points.
+        Takes an (N, 2) array (or a list of Points); returns an (M, 2) float32 array.
+        """
+        pts = CatmullRomSpline._as_array(points)
+        if len(pts) < 2:
+            return pts
         
-        if len(points) == 2:
-            return CatmullRomSpline._linear_interpolate(points[0], points[1], num_segments)
+        if len(pts) == 2:
+            return CatmullRomSpline._linear_interpolate(pts[0], pts[1], num_segments)
         
         # Need at least 4 points for Catmull-Rom, pad if necessary
-        padded = [points[0]] + points + [points[-1]]
+        padded = np.concatenate([pts[:1], pts, pts[-1:]])
         
-        smooth_points = []
-        for i in range(len(points) - 1):
-            p0 = padded[i]
-            p1 = padded[i + 1]
-            p2 = padded[i + 2]
-            p3 = padded[i + 3] if i + 3 < len(padded) else padded[-1]
-            
-            segment = CatmullRomSpline._catmull_rom_segment(p0, p1, p2, p3, num_segments)
-            smooth_points.extend(segment[:-1])  # Avoid duplicates
+        # All segments at once: control points as (K, 1, 2) against t as (S+1, 1)
+        p0 = padded[:-3, None, :]
+        p1 = padded[1:-2, None, :]
+        p2 = padded[2:-1, None, :]
+        p3 = padded[3:, None, :]
+        curve = CatmullRomSpline._catmull_rom_segment(p0, p1, p2, p3, num_segments)
         
-        smooth_points.append(points[-1])
-        return smooth_points
+        # Drop each segment's endpoint (it starts the next one), keep the final point
+        return np.concatenate([curve[:, :-1].reshape(-1, 2), pts[-1:]])
+    
+    @staticmethod
+    def _as_array(points) -> np.ndarray:
+        """Convert a list of Points (or array-like) to an (N, 2) float32 array."""
+        if isinstance(points, np.ndarray):
+            return points.astype(np.float32, copy=False).reshape(-1, 2)
+        return np.array([(p.x, p.y) for p in points], dtype=np.float32).reshape(-1, 2)
+    
+    @staticmethod
+    @lru_cache(maxsize=8)
+    def _t_powers(num_segments: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Cached (t, t^2, t^3) column vectors for a segment count."""
+        t = np.linspace(0, 1, num_segments + 1, dtype=np.float32)[:, None]
+        t2 = t * t
+        return t, t2, t2 * t
     
     @staticmethod
-    def _catmull_rom_segment(p0: Point, p1: Point, p2: Point, p3: Point, 
-                            num_segments: int) -> List[Point]:
-        """Interpolate between p1 and p2 using p0 and p3 for curvature."""
-        result = []
-        for i in range(num_segments + 1):
-            t = i / num_segments
-            t2 = t * t
-            t3 = t2 * t
-            
-            # Catmull-Rom matrix
-            x = 0.5 * ((2 * p1.x) +
-                       (-p0.x + p2.x) * t +
-                       (2 * p0.x - 5 * p1.x + 4 * p2.x - p3.x) * t2 +
-                       (-p0.x + 3 * p1.x - 3 * p2.x + p3.x) * t3)
-            
-            y = 0.5 * ((2 * p1.y) +
-                       (-p0.y + p2.y) * t +
-                       (2 * p0.y - 5 * p1.y + 4 * p2.y - p3.y) * t2 +
-                       (-p0.y + 3 * p1.y - 3 * p2.y + p3.y) * t3)
-            
-            result.append(Point(x, y))
-        
-        return result
+    def _catmull_rom_segment(p0: np.ndarray, p1: np.ndarray, p2: np.ndarray,
+                            p3: np.ndarray, num_segments: int) -> np.ndarray:
+        """
+        Interpolate between p1 and p2 using p0 and p3 for curvature.
+        Points may carry leading batch dims, e.g. (K, 1, 2) for K segments.
+        """
+        t, t2, t3 = CatmullRomSpline._t_powers(num_segments)
+        
+        # Catmull-Rom matrix, evaluated for every t (and both axes) at once
+        return 0.5 * ((2 * p1) +
+                      (-p0 + p2) * t +
+                      (2 * p0 - 5 * p1 + 4 * p2 - p3) * t2 +
+                      (-p0 + 3 * p1 - 3 * p2 + p3) * t3)
     
     @staticmethod
-    def _linear_interpolate(p1: Point, p2: Point, num_segments: int) -> List[Point]:
+    def _linear_interpolate(p1: np.ndarray, p2: np.ndarray, num_segments: int) -> np.ndarray:
         """Simple linear interpolation for 2-point case."""
-        result = []
-        for i in range(num_segments + 1):
-            t = i / num_segments
-            x = p1.x + (p2.x - p1.x) * t
-            y = p1.y + (p2.y - p1.y) * t
-            result.append(Point(x, y))
-        return result
+        t, _, _ = CatmullRomSpline._t_powers(num_segments)
+        return p1 + (p2 - p1) * t
 
 
 class GestureCanvas:
@@ -163,10 +220,21 @@ class GestureCanvas:
         
         # Dual buffers
         self.canvas = np.full((*internal_size, 3), 255, dtype=np.uint8)  # White background
-        self.display_buffer = np.full((*display_size, 3), 255, dtype=np.uint8)
+        # display_size is (w, h) as used by cv2.resize
+        self.display_buffer = np.full((display_size[1], display_size[0], 3), 255, dtype=np.uint8)
+        self._display_dirty = True
+        
+        # Bumped on every pixel change, so consumers can tell a canvas they've
+        # already processed from a new drawing without comparing pixels
+        self.version = 0
+        
+        # True while a snapshot() shares self.canvas; the next write copies it first
+        self._shared = False
         
         # Drawing state
-        self.current_stroke: List[Point] = []
+        # Current stroke points as a growable (capacity, 2) float32 buffer
+        self._stroke_pts = np.empty((256, 2), dtype=np.float32)
+        self._stroke_len = 0
         self.is_drawing = False
         self.brush_color = (0, 0, 0)  # Black
         self.brush_thickness = 3
@@ -174,8 +242,18 @@ class GestureCanvas:
         # Undo/redo
         self.undo_manager = CanvasUndoManager(max_history=50)
         
+        # Pre-stroke pixels, backed up lazily as the stroke bbox grows
+        self._stroke_backup = np.empty_like(self.canvas)
+        self._stroke_bbox: Optional[List[int]] = None  # [x1, y1, x2, y2], exclusive
+        
         # Performance tracking
         self.dirty_rect: Optional[Tuple[int, int, int, int]] = None
+        
+        # Gesture mapping: vertical stretch of 1.2 as the exact ratio 6/5
+        cw, ch = internal_size
+        self._map_w = cw
+        self._map_h6 = ch * 6
+        self._map_h_max = ch - 1
     
     def gesture_to_canvas_coords(self, gesture_x: int, gesture_y: int,
                                  gesture_frame_size: Tuple[int, int]) -> Tuple[int, int]:
@@ -184,29 +262,39 @@ class GestureCanvas:
         Handles aspect ratio differences between gesture space and canvas.
         """
         gw, gh = gesture_frame_size
-        cw, ch = self.internal_size
-        
-        # Normalize to [0, 1]
-        norm_x = gesture_x / gw
-        norm_y = gesture_y / gh
         
-        # Apply aspect ratio correction
-        # Vertical range is typically more limited in gestures
-        # Apply a slight vertical scaling to compensate
-        aspect_correction = 1.2
-        norm_y = norm_y * aspect_correction
-        norm_y = np.clip(norm_y, 0, 1)
+        # Integer math only: x * cw / gw, and y * ch * 1.2 / gh
+        # (vertical range is typically more limited in gestures, so stretch it)
+        canvas_x = int(gesture_x * self._map_w // gw)
+        canvas_y = int(gesture_y * self._map_h6 // (gh * 5))
         
-        # Map to canvas
-        canvas_x = int(norm_x * cw)
-        canvas_y = int(norm_y * ch)
+        # Clamp y to the canvas
+        if canvas_y < 0:
+            canvas_y = 0
+        elif canvas_y > self._map_h_max:
+            canvas_y = self._map_h_max
         
         return canvas_x, canvas_y
     
+    @property
+    def current_stroke(self) -> np.ndarray:
+        """Points of the stroke in progress as an (N, 2) float32 view."""
+        return self._stroke_pts[:self._stroke_len]
+    
+    def _append_point(self, x: float, y: float):
+        """Append to the stroke buffer, doubling capacity when full."""
+        if self._stroke_len >= len(self._stroke_pts):
+            grown = np.empty((len(self._stroke_pts) * 2, 2), dtype=np.float32)
+            grown[:self._stroke_len] = self._stroke_pts[:self._stroke_len]
+            self._stroke_pts = grown
+        self._stroke_pts[self._stroke_len] = (x, y)
+        self._stroke_len += 1
+    
     def start_stroke(self, x: int, y: int):
         """Begin a new stroke."""
         self.is_drawing = True
-        self.current_stroke = [Point(x, y)]
+        self._stroke_len = 0
+        self._append_point(x, y)
         self._save_undo_checkpoint()
     
     def add_point(self, x: int, y: int):
@@ -214,92 +302,161 @@ class GestureCanvas:
         if not self.is_drawing:
             return
         
-        self.current_stroke.append(Point(x, y))
+        self._append_point(x, y)
         
         # Draw smooth line from previous point
-        if len(self.current_stroke) >= 2:
+        if self._stroke_len >= 2:
             self._draw_smooth_segment()
+            self._mark_changed()
     
     def end_stroke(self):
         """Finish current stroke."""
-        if self.is_drawing and len(self.current_stroke) > 1:
+        if self.is_drawing and self._stroke_len > 1:
             # Final smoothing pass
             self._draw_final_stroke()
         
         self.is_drawing = False
-        self.current_stroke = []
+        self._stroke_len = 0
     
     def _save_undo_checkpoint(self):
-        """Save current canvas state for undo."""
-        self.canvas_before_stroke = self.canvas.copy()
+        """Start a new undo checkpoint (pixels are backed up as the stroke grows)."""
+        self._stroke_bbox = None
+    
+    def _expand_stroke_bbox(self, pts: np.ndarray):
+        """Grow the stroke bbox to cover pts, backing up newly covered pixels first."""
+        h, w = self.canvas.shape[:2]
+        pad = self.brush_thickness + 1
+        x1 = max(0, int(pts[:, 0].min()) - pad)
+        y1 = max(0, int(pts[:, 1].min()) - pad)
+        x2 = min(w, int(pts[:, 0].max()) + pad + 1)
+        y2 = min(h, int(pts[:, 1].max()) + pad + 1)
+        if x2 <= x1 or y2 <= y1:
+            return  # Entirely off-canvas
+        
+        if self._stroke_bbox is None:
+            self._stroke_backup[y1:y2, x1:x2] = self.canvas[y1:y2, x1:x2]
+            self._stroke_bbox = [x1, y1, x2, y2]
+            return
+        
+        bx1, by1, bx2, by2 = self._stroke_bbox
+        nx1, ny1, nx2, ny2 = min(bx1, x1), min(by1, y1), max(bx2, x2), max(by2, y2)
+        
+        # Only the strips outside the old bbox are still untouched by this stroke
+        for sx1, sy1, sx2, sy2 in ((nx1, ny1, nx2, by1),   # Top
+                                   (nx1, by2, nx2, ny2),   # Bottom
+                                   (nx1, by1, bx1, by2),   # Left
+                                   (bx2, by1, nx2, by2)):  # Right
+            if sx2 > sx1 and sy2 > sy1:
+                self._stroke_backup[sy1:sy2, sx1:sx2] = self.canvas[sy1:sy2, sx1:sx2]
+        
+        self._stroke_bbox = [nx1, ny1, nx2, ny2]
     
     def _draw_smooth_segment(self):
         """Draw smoothed segment using Catmull-Rom splines."""
-        if len(self.current_stroke) < 2:
+        n = self._stroke_len
+        if n < 2:
             return
         
         # Get recent points for local smoothing
-        recent = self.current_stroke[-4:] if len(self.current_stroke) >= 4 else self.current_stroke
+        recent = self._stroke_pts[max(0, n - 4):n]
         smooth = CatmullRomSpline.interpolate(recent, num_segments=5)
+        self._expand_stroke_bbox(smooth)
         
         # Draw only the new segment
-        for i in range(len(smooth) - 1):
-            p1 = smooth[i]
-            p2 = smooth[i + 1]
-            cv2.line(self.canvas,
-                    (int(p1.x), int(p1.y)),
-                    (int(p2.x), int(p2.y)),
-                    self.brush_color,
-                    self.brush_thickness)
+        self._own_buffer()
+        cv2.polylines(self.canvas, [smooth.astype(np.int32)], False,
+                      self.brush_color, self.brush_thickness, cv2.LINE_AA)
     
     def _draw_final_stroke(self):
         """Draw final smoothed stroke and save to undo."""
         # Full stroke smoothing
         smooth = CatmullRomSpline.interpolate(self.current_stroke, num_segments=5)
+        self._expand_stroke_bbox(smooth)
+        if self._stroke_bbox is None:
+            return
         
-        # Clear and redraw entire stroke with full smoothing
-        # (This ensures best quality for the final result)
-        temp = self.canvas_before_stroke.copy()
+        x1, y1, x2, y2 = self._stroke_bbox
+        before = self._stroke_backup[y1:y2, x1:x2].copy()
         
-        for i in range(len(smooth) - 1):
-            p1 = smooth[i]
-            p2 = smooth[i + 1]
-            cv2.line(temp,
-                    (int(p1.x), int(p1.y)),
-                    (int(p2.x), int(p2.y)),
-                    self.brush_color,
-                    self.brush_thickness)
+        # Roll back the live preview inside the bbox, then redraw the whole
+        # stroke with full smoothing (the bbox padding covers the brush)
+        self._own_buffer()
+        self.canvas[y1:y2, x1:x2] = before
+        cv2.polylines(self.canvas, [smooth.astype(np.int32)], False,
+                      self.brush_color, self.brush_thickness, cv2.LINE_AA)
         
-        # Save to undo
-        self.undo_manager.save_state(self.canvas_before_stroke, temp)
-        self.canvas = temp
+        # Save to undo (bbox is already known, no diff needed)
+        self.undo_manager.save_region((x1, y1, x2, y2), before)
+        self._mark_changed()
     
     def clear(self):
         """Clear canvas."""
-        self._save_undo_checkpoint()
-        self.undo_manager.save_state(self.canvas, np.full_like(self.canvas, 255))
-        self.canvas.fill(255)
+        white = np.full_like(self.canvas, 255)
+        self.undo_manager.save_state(self.canvas, white)
+        if self._shared:
+            # No point copying pixels that are about to be overwritten
+            self.canvas = white
+            self._shared = False
+        else:
+            self.canvas.fill(255)
+        self._mark_changed()
     
     def undo(self):
         """Undo last operation."""
+        if self.undo_manager.history:
+            self._own_buffer()
         result = self.undo_manager.undo(self.canvas)
         if result is not None:
             self.canvas = result
+            self._mark_changed()
     
     def redo(self):
         """Redo last undone operation."""
+        if self.undo_manager.redo_stack:
+            self._own_buffer()
         result = self.undo_manager.redo(self.canvas)
         if result is not None:
             self.canvas = result
+            self._mark_changed()
+    
+    def _own_buffer(self):
+        """Copy the canvas before writing to it if a snapshot still shares it."""
+        if self._shared:
+            self.canvas = self.canvas.copy()
+            self._shared = False
+    
+    def _mark_changed(self):
+        """Record a pixel change: the display needs a resize and the version moves on."""
+        self._display_dirty = True
+        self.version += 1
     
     def get_display(self) -> np.ndarray:
-        """Get resized canvas for display."""
-        return cv2.resize(self.canvas, self.display_size)
+        """
+        Get resized canvas for display.
+        Only re-resizes when the canvas changed; the returned buffer is
+        reused between calls, so treat it as read-only.
+        """
+        if self._display_dirty:
+            cv2.resize(self.canvas, self.display_size, dst=self.display_buffer,
+                       interpolation=cv2.INTER_AREA)
+            self._display_dirty = False
+        return self.display_buffer
     
     def get_canvas(self) -> np.ndarray:
-        """Get full-resolution canvas."""
+        """Get full-resolution canvas (independent copy)."""
         return self.canvas.copy()
     
+    def snapshot(self) -> np.ndarray:
+        """
+        Get a read-only snapshot of the full-resolution canvas without copying.
+        The canvas copies its buffer on the next write instead (copy-on-write),
+        so the snapshot never changes. Take it under the lock that guards drawing.
+        """
+        self._shared = True
+        view = self.canvas.view()
+        view.flags.writeable = False
+        return view
+    
     def set_brush_color(self, color: Tuple[int, int, int]):
         """Set brush color (BGR)."""
         self.brush_color = color
@@ -1,14 +1,48 @@
+from enum import IntEnum
+
 # MediaPipe Hand Tracking Configuration
 HAND_TRACKING_CONF = {
     'max_num_hands': 2,
     'min_detection_confidence': 0.7,  # Higher to reduce false positives
     'min_tracking_confidence': 0.5,
-    'model_complexity': 1  # 0 or 1. 1 is more accurate but slower.
+    'model_complexity': 0  # 0 (lite, ~2x faster) or 1 (full, more accurate)
 }
 
+# GPU hand tracking via the MediaPipe Tasks HandLandmarker (GPU delegate).
+# Used only if the model file exists and the GPU delegate initializes;
+# otherwise the CPU Solutions tracker (lite model) above is used.
+HAND_TRACKING_GPU = True
+HAND_LANDMARKER_MODEL = 'models/hand_landmarker.task'
+
+# INT8-quantized HandLandmarker bundle for the CPU path (XNNPACK int8 kernels).
+# Tried when the GPU landmarker isn't in use and the bundle exists; set False to
+# stay on the FP32 Solutions tracker, since quantized landmarks are a bit less accurate.
+HAND_TRACKING_INT8 = True
+HAND_LANDMARKER_INT8_MODEL = 'models/hand_landmarker_int8.task'
+
+# Tracking input bound (w, h): frames are downscaled to fit before MediaPipe.
+# Landmarks come back normalized, so they still map to full-res pixels. None = full res.
+TRACK_SIZE = (256, 256)
+
 # Smoothing Configuration
 SMOOTHING_ALPHA = 0.3  # Exponential Moving Average factor (0.0 - 1.0). Lower = more smooth, more lag.
 
+# Recognized Gestures
+class Gesture(IntEnum):
+    """Gesture labels as ints (cheap comparisons); str()/f-strings give the name."""
+    NONE = 0
+    UNKNOWN = 1
+    PINCH = 2
+    FIST = 3
+    POINTING = 4
+    OPEN_PALM = 5
+
+    def __str__(self):
+        return self.name
+
+    def __format__(self, format_spec):
+        return format(self.name, format_spec)
+
 # Gesture Recognition Thresholds
 GESTURE_THRESHOLDS = {
     'finger_extended_ratio': 1.3,  # Tip-to-wrist / MCP-to-wrist ratio
@@ -20,3 +54,30 @@ GESTURE_THRESHOLDS = {
 # Canvas Configuration
 CANVAS_SIZE = (1024, 1024)
 DISPLAY_SIZE = (1280, 720)  # Target display size
+
+# Style Transfer Configuration
+SD_PRECISION = 'fp16'  # 'fp16', 'bf16', 'int8' (8-bit UNet weights via bitsandbytes) or 'fp8'
+                       # (bf16 pipeline, FP8 UNet linears via torchao; Ada/Hopper only). CPU always runs fp32
+SD_COMPILE = False     # torch.compile the UNet and VAE decoder (CUDA only); pays a compile per new input size
+SD_VAE_BF16 = True     # Run the fp16/int8 pipelines' VAE in bf16 instead of upcasting it to fp32
+SD_SLICING_VRAM_GB = 12  # GPUs with less VRAM slice attention (slower, but fits batched SDXL)
+USE_DEEPCACHE = True  # Reuse deep UNet features across timesteps (needs the DeepCache package)
+DEEPCACHE_PARAMS = {
+    'cache_interval': 3,   # Full UNet pass every N steps
+    'cache_branch_id': 0,  # Shallowest skip branch that is recomputed
+    'min_steps': 5         # Turbo/LCM runs (<= 4 steps) have nothing to reuse
+}
+
+# Generation worker batching: once a request arrives, wait up to max_wait seconds
+# for more and run same-style canvases through one pipeline call
+GENERATION_BATCH = {
+    'max_batch': 4,    # Canvases per pipeline call (bounded by VRAM)
+    'max_wait': 0.05   # Seconds to hold the first request while others arrive
+}
+
+# Repeat-sketch cache: regenerating an unchanged canvas refines its cached styled result
+STYLE_CACHE = {
+    'size': 16,               # Entries kept (LRU)
+    'hash_size': 8,           # pHash is hash_size^2 bits; hits also need identical pixels
+    'refine_strength': 0.25   # img2img strength when refining a cached result
+}
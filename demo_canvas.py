@@ -8,13 +8,48 @@ import cv2
 import sys
 import os
 import time
+from collections import deque
 
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from hand_tracking import HandTracker
+from hand_tracking import HandTracker, circle_offsets, scatter_marker
 from gesture_recognition import GestureRecognizer
 from canvas import GestureCanvas
+from config import Gesture
+from performance import IntelligentFrameSkipper
+from threading_manager import CameraReader
+
+LANDMARK_DOT = circle_offsets(3, -1)
+
+# MJPEG at 640x480 with only the newest frame queued (FOURCC must precede the size)
+CAMERA_PARAMS = [
+    cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'),
+    cv2.CAP_PROP_FRAME_WIDTH, 640,
+    cv2.CAP_PROP_FRAME_HEIGHT, 480,
+    cv2.CAP_PROP_BUFFERSIZE, 1,
+]
+
+
+def open_camera(index):
+    """Open a webcam configured with CAMERA_PARAMS, or return None."""
+    # On Linux hand V4L2 the whole format up front so it negotiates once
+    if sys.platform.startswith('linux'):
+        cap = cv2.VideoCapture(index, cv2.CAP_V4L2, CAMERA_PARAMS)
+        if cap.isOpened():
+            return cap
+        cap.release()
+    
+    # Other platforms (or V4L2 refused a param): default backend, then set each one
+    cap = cv2.VideoCapture(index)
+    if not cap.isOpened():
+        cap.release()
+        return None
+    for prop, value in zip(CAMERA_PARAMS[::2], CAMERA_PARAMS[1::2]):
+        if not cap.set(prop, value) and prop == cv2.CAP_PROP_BUFFERSIZE:
+            print("Warning: camera backend ignored CAP_PROP_BUFFERSIZE; expect extra latency")
+    return cap
+
 
 def main():
     tracker = HandTracker()
@@ -24,8 +59,8 @@ def main():
     # Find working camera
     cap = None
     for i in range(4):
-        test_cap = cv2.VideoCapture(i)
-        if test_cap.isOpened():
+        test_cap = open_camera(i)
+        if test_cap is not None:
             ret, _ = test_cap.read()
             if ret:
                 cap = test_cap
@@ -38,9 +73,6 @@ def main():
         print("For video file mode, run: python demo_canvas.py --video <path>")
         return
 
-    cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-    
     print("\n" + "="*60)
     print("GESTURE-CONTROLLED CANVAS DEMO")
     print("="*60)
@@ -52,82 +84,103 @@ def main():
     print("\nPress 'q' to quit, 's' to save canvas")
     print("="*60 + "\n")
 
-    prev_gesture = "NONE"
-    prev_time = time.time()
-    fps_samples = []
+    prev_gesture = Gesture.NONE
+    prev_time = time.perf_counter()
+    fps_samples = deque(maxlen=30)
+    fps_sum = 0.0
     clear_hold_time = None
     
+    frame_skipper = IntelligentFrameSkipper(target_fps=20, display_fps=30)
+    hand = None
+    gesture = Gesture.NONE
+    
+    # Capture runs on its own thread so a slow tracking frame never backs up
+    # the camera; we always pick up the newest frame and drop the rest
+    reader = CameraReader(cap).start()
+    frame_id = 0
+    combined = None
+    
     while True:
-        frame_start = time.time()
+        frame_start = time.perf_counter()
         
-        ret, frame = cap.read()
-        if not ret:
+        frame_id, raw = reader.read(frame_id)
+        if raw is None:
+            if reader.running:
+                continue
             break
         
-        frame = cv2.flip(frame, 1)
-        h, w = frame.shape[:2]
+        # Webcam and canvas share one side-by-side buffer; the mirrored frame
+        # is written straight into its left half
+        h, w = raw.shape[:2]
+        if combined is None or combined.shape[0] != h or combined.shape[1] != 2 * w:
+            combined = np.empty((h, 2 * w, 3), dtype=np.uint8)
+        frame = cv2.flip(raw, 1, dst=combined[:, :w])
         
-        # Track hands and recognize gestures
-        hands_data = tracker.process_frame(frame)
-        gesture = "NONE"
-        
-        if hands_data:
-            hand = hands_data[0]
-            gesture = recognizer.detect_gesture(hand['landmarks'])
-            
-            # Get index fingertip position
-            index_tip = hand['landmarks'][8]
+        # Every frame is displayed, only the ones the skipper lets through are tracked
+        if frame_skipper.should_process_gesture():
+            # Track hands and recognize gestures
+            hands_data = tracker.process_frame(frame)
+            hand = hands_data[0] if hands_data else None
+            gesture = Gesture.NONE
             
-            # Transform to canvas coordinates
-            canvas_x, canvas_y = canvas.gesture_to_canvas_coords(
-                index_tip['x'], index_tip['y'], (w, h)
-            )
-            
-            # Handle gestures
-            if gesture == "POINTING":
-                if not canvas.is_drawing:
-                    canvas.start_stroke(canvas_x, canvas_y)
+            if hand is not None:
+                gesture = recognizer.detect_gesture(hand['landmarks_np'])
+                
+                # Get index fingertip position
+                tip_x, tip_y = hand['landmarks_np'][8].tolist()
+                
+                # Transform to canvas coordinates
+                canvas_x, canvas_y = canvas.gesture_to_canvas_coords(tip_x, tip_y, (w, h))
+                
+                # Handle gestures
+                if gesture == Gesture.POINTING:
+                    if not canvas.is_drawing:
+                        canvas.start_stroke(canvas_x, canvas_y)
+                    else:
+                        canvas.add_point(canvas_x, canvas_y)
+                    clear_hold_time = None
+                
+                elif gesture != Gesture.POINTING and canvas.is_drawing:
+                    canvas.end_stroke()
+                
+                if gesture == Gesture.PINCH and prev_gesture != Gesture.PINCH:
+                    canvas.undo()
+                    clear_hold_time = None
+                
+                if gesture == Gesture.OPEN_PALM:
+                    if clear_hold_time is None:
+                        clear_hold_time = time.perf_counter()
+                    elif time.perf_counter() - clear_hold_time > 1.0:
+                        canvas.clear()
+                        clear_hold_time = None
                 else:
-                    canvas.add_point(canvas_x, canvas_y)
-                clear_hold_time = None
-            
-            elif gesture != "POINTING" and canvas.is_drawing:
-                canvas.end_stroke()
-            
-            if gesture == "PINCH" and prev_gesture != "PINCH":
-                canvas.undo()
-                clear_hold_time = None
-            
-            if gesture == "OPEN_PALM":
-                if clear_hold_time is None:
-                    clear_hold_time = time.time()
-                elif time.time() - clear_hold_time > 1.0:
-                    canvas.clear()
                     clear_hold_time = None
-            else:
-                clear_hold_time = None
             
-            # Draw hand skeleton
-            for lm in hand['landmarks']:
-                color = (0, 255, 0) if gesture == "POINTING" else (255, 255, 255)
-                cv2.circle(frame, (lm['x'], lm['y']), 3, color, -1)
-            
-            # Draw cursor on canvas
-            if gesture == "POINTING":
-                cv2.circle(frame, (index_tip['x'], index_tip['y']), 8, (0, 255, 0), 2)
+            prev_gesture = gesture
         
         # Get canvas display
         canvas_display = canvas.get_display()
+        if canvas_display.shape[:2] == (h, w):
+            combined[:, w:] = canvas_display
+        else:
+            cv2.resize(canvas_display, (w, h), dst=combined[:, w:])
         
-        # Create combined view (webcam + canvas side by side)
-        combined = np.hstack([frame, canvas_display])
+        if hand is not None:
+            # Draw hand skeleton (all 21 dots in one write, clipped to the webcam half)
+            color = (0, 255, 0) if gesture == Gesture.POINTING else (255, 255, 255)
+            scatter_marker(frame, hand['landmarks_np'], LANDMARK_DOT, color)
+            
+            # Draw cursor on canvas
+            if gesture == Gesture.POINTING:
+                cv2.circle(combined, tuple(hand['landmarks_np'][8].tolist()), 8, (0, 255, 0), 2)
         
         # FPS calculation
-        fps = 1.0 / (time.time() - frame_start)
+        fps = 1.0 / (time.perf_counter() - frame_start)
+        if len(fps_samples) == fps_samples.maxlen:
+            fps_sum -= fps_samples[0]
         fps_samples.append(fps)
-        if len(fps_samples) > 30:
-            fps_samples.pop(0)
-        avg_fps = sum(fps_samples) / len(fps_samples)
+        fps_sum += fps
+        avg_fps = fps_sum / len(fps_samples)
         
         # UI Overlays
         cv2.putText(combined, f"FPS: {int(avg_fps)}", (10, 30),
@@ -142,7 +195,7 @@ def main():
         
         # Clear countdown
         if clear_hold_time is not None:
-            time_held = time.time() - clear_hold_time
+            time_held = time.perf_counter() - clear_hold_time
             cv2.putText(combined, f"Hold to clear: {time_held:.1f}s", (10, 120),
                         cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
         
@@ -161,15 +214,15 @@ def main():
             canvas.redo()
         elif key == ord('c'):
             canvas.clear()
-        
-        prev_gesture = gesture
     
+    reader.stop()
     cap.release()
     cv2.destroyAllWindows()
     tracker.close()
     
     print(f"\nFinal Stats:")
     print(f"  Average FPS: {avg_fps:.1f}")
+    print(f"  Frames Skipped: {frame_skipper.get_skip_ratio():.0%}")
     print(f"  Memory Usage: {mem['total_mb']:.1f}MB")
 
 
@@ -7,6 +7,7 @@ import OnboardingOverlay from './components/OnboardingOverlay'
 import LoadingScreen from './components/LoadingScreen'
 import { type SystemStatus } from './components/StatusPill' // Keep type import
 import { WebSocketClient } from './services/WebSocketClient'
+import { packVideoFrame } from './services/rawFrame'
 import { Wand2, RefreshCw, HelpCircle } from 'lucide-react'
 
 const STYLES: StyleOption[] = [
@@ -17,6 +18,9 @@ const STYLES: StyleOption[] = [
   { id: 'sketch', name: 'Sketch', color: 'bg-gray-500' },
 ]
 
+// Seconds the server may hold each /result request waiting for the image
+const RESULT_WAIT_S = 10
+
 function App() {
   const [backendReady, setBackendReady] = useState(true) // Force true to bypass health check issues
   const [status, setStatus] = useState<SystemStatus>('disconnected')
@@ -29,7 +33,7 @@ function App() {
   const wsRef = useRef<WebSocketClient | null>(null)
   const canvasRef = useRef<DrawingCanvasRef>(null)
   const lastFrameTime = useRef(0)
-  const pollIntervalRef = useRef<number | null>(null)
+  const pollAbortRef = useRef<AbortController | null>(null)
 
   useEffect(() => {
     // Check backend health
@@ -49,11 +53,9 @@ function App() {
       setShowOnboarding(true)
     }
 
-    // Cleanup polling interval on unmount
+    // Abort any in-flight result poll on unmount
     return () => {
-      if (pollIntervalRef.current) {
-        clearInterval(pollIntervalRef.current)
-      }
+      pollAbortRef.current?.abort()
     }
   }, [])
 
@@ -121,15 +123,29 @@ function App() {
     return () => ws.disconnect()
   }, [backendReady])
 
-  const handleFrame = (canvas: HTMLCanvasElement) => {
+  const handleFrame = (canvas: HTMLCanvasElement, video?: HTMLVideoElement) => {
     // Limit FPS to 30 to save bandwidth
     const now = Date.now()
     if (now - lastFrameTime.current < 33) return
     lastFrameTime.current = now
 
     if (wsRef.current) {
-      const base64 = canvas.toDataURL('image/jpeg', 0.7)
-      wsRef.current.send(base64)
+      const ws = wsRef.current
+      // Raw JPEG bytes as a binary message (no base64 data URL)
+      const sendJpeg = () => canvas.toBlob((blob) => {
+        if (blob) ws.send(blob)
+      }, 'image/jpeg', 0.7)
+
+      // Where WebCodecs is available, ship the decoder's own YUV planes instead
+      if (video && 'VideoFrame' in window) {
+        const frame = new VideoFrame(video)
+        packVideoFrame(frame)
+          .then((buffer) => buffer ? ws.send(buffer) : sendJpeg())
+          .catch(sendJpeg)
+          .finally(() => frame.close())
+      } else {
+        sendJpeg()
+      }
     }
   }
 
@@ -154,13 +170,14 @@ function App() {
       if (data.status === 'queued') {
         const requestId = data.request_id
 
-        // Poll for result with timeout
-        let pollCount = 0
-        const maxPolls = 60  // 60 seconds timeout
+        // Long-poll for the result: the server holds each request until the
+        // result lands (or RESULT_WAIT_S passes), so it arrives without a poll delay
+        const controller = new AbortController()
+        pollAbortRef.current = controller
+        const deadline = Date.now() + 60_000  // 60 seconds timeout
 
-        pollIntervalRef.current = window.setInterval(async () => {
-          if (pollCount++ > maxPolls) {
-            if (pollIntervalRef.current) clearInterval(pollIntervalRef.current)
+        while (!controller.signal.aborted) {
+          if (Date.now() > deadline) {
             setIsGenerating(false)
             setStatus('idle')
             alert('Generation timed out. Please try again.')
@@ -168,24 +185,29 @@ function App() {
           }
 
           try {
-            const res = await fetch(`/result/${requestId}`)
+            const res = await fetch(`/result/${requestId}?wait=${RESULT_WAIT_S}`, { signal: controller.signal })
             const result = await res.json()
 
             if (result.status === 'complete') {
-              if (pollIntervalRef.current) clearInterval(pollIntervalRef.current)
               setGeneratedImage(`data:image/jpeg;base64,${result.image}`)
               setIsGenerating(false)
               setStatus('idle')
+              return
             } else if (result.status === 'failed') {
-              if (pollIntervalRef.current) clearInterval(pollIntervalRef.current)
               setIsGenerating(false)
               setStatus('idle')
               alert('Generation failed: ' + (result.error || 'Unknown error'))
+              return
+            } else if (result.status === 'not_found') {
+              // Nothing to wait on server-side; back off instead of spinning
+              await new Promise((resolve) => setTimeout(resolve, 1000))
             }
           } catch (pollError) {
+            if (controller.signal.aborted) return
             console.error('Polling error:', pollError)
+            await new Promise((resolve) => setTimeout(resolve, 1000))
           }
-        }, 1000)
+        }
       }
     } catch (e) {
       console.error(e)
@@ -1,7 +1,7 @@
 import React, { useEffect, useRef } from 'react'
 
 interface WebcamFeedProps {
-    onFrame: (canvas: HTMLCanvasElement) => void
+    onFrame: (canvas: HTMLCanvasElement, video: HTMLVideoElement) => void
     demoMode?: boolean
 }
 
@@ -78,7 +78,7 @@ const WebcamFeed: React.FC<WebcamFeedProps> = ({ onFrame, demoMode = false }) =>
 
                 if (ctx && video.readyState === video.HAVE_ENOUGH_DATA) {
                     ctx.drawImage(video, 0, 0, canvas.width, canvas.height)
-                    onFrame(canvas)
+                    onFrame(canvas, video)
                 }
             }
             animationId = requestAnimationFrame(processFrame)
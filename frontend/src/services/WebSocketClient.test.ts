@@ -41,6 +41,15 @@ describe('WebSocketClient', () => {
         expect(mockWs.send).toHaveBeenCalledWith('test message')
     })
 
+    it('should send binary frames', () => {
+        client.connect()
+        if (mockWs.onopen) mockWs.onopen({} as any)
+
+        const frame = new Blob([new Uint8Array([0xff, 0xd8])], { type: 'image/jpeg' })
+        client.send(frame)
+        expect(mockWs.send).toHaveBeenCalledWith(frame)
+    })
+
     it('should handle incoming messages', () => {
         const onMessage = vi.fn()
         client.on('message', onMessage)
@@ -53,6 +62,17 @@ describe('WebSocketClient', () => {
         expect(onMessage).toHaveBeenCalledWith({ gesture: 'POINTING' })
     })
 
+    it('should handle binary JSON messages', () => {
+        const onMessage = vi.fn()
+        client.on('message', onMessage)
+        client.connect()
+
+        const data = new TextEncoder().encode(JSON.stringify({ gesture: 'FIST' })).buffer
+        if (mockWs.onmessage) mockWs.onmessage({ data } as any)
+
+        expect(onMessage).toHaveBeenCalledWith({ gesture: 'FIST' })
+    })
+
     it('should handle disconnection', () => {
         const onClose = vi.fn()
         client.on('close', onClose)
@@ -1,6 +1,8 @@
 type WebSocketEvent = 'message' | 'open' | 'close' | 'error'
 type EventHandler = (data: any) => void
 
+const decoder = new TextDecoder()
+
 export class WebSocketClient {
     private url: string
     private ws: WebSocket | null = null
@@ -28,6 +30,8 @@ export class WebSocketClient {
 
         try {
             this.ws = new WebSocket(this.url)
+            // The server sends JSON as binary messages
+            this.ws.binaryType = 'arraybuffer'
 
             this.ws.onopen = (event) => {
                 this.reconnectAttempts = 0 // Reset on successful connection
@@ -36,7 +40,8 @@ export class WebSocketClient {
 
             this.ws.onmessage = (event) => {
                 try {
-                    const data = JSON.parse(event.data)
+                    const text = typeof event.data === 'string' ? event.data : decoder.decode(event.data)
+                    const data = JSON.parse(text)
                     this.handlers.message.forEach(h => h(data))
                 } catch (e) {
                     console.error('Failed to parse WebSocket message', e)
@@ -68,7 +73,7 @@ export class WebSocketClient {
         }
     }
 
-    send(data: string) {
+    send(data: string | Blob | ArrayBuffer) {
         if (this.ws && this.ws.readyState === WebSocket.OPEN) {
             this.ws.send(data)
         } else {
@@ -0,0 +1,28 @@
+import { describe, it, expect, vi } from 'vitest'
+import { packVideoFrame, RAW_HEADER_SIZE } from './rawFrame'
+
+const mockFrame = (format: string | null, width: number, height: number) => ({
+    format,
+    visibleRect: { width, height },
+    allocationSize: () => width * height * 3 / 2,
+    copyTo: vi.fn(async (dest: Uint8Array) => { dest.fill(7) })
+}) as any
+
+describe('packVideoFrame', () => {
+    it('should prefix I420 planes with the frame header', async () => {
+        const buffer = await packVideoFrame(mockFrame('I420', 4, 2))
+        expect(buffer).not.toBeNull()
+
+        const view = new DataView(buffer!)
+        expect(view.getUint16(0, true)).toBe(4)
+        expect(view.getUint16(2, true)).toBe(2)
+        expect(view.getUint8(4)).toBe(1)
+        expect(buffer!.byteLength).toBe(RAW_HEADER_SIZE + 12)
+        expect(new Uint8Array(buffer!, RAW_HEADER_SIZE)[0]).toBe(7)
+    })
+
+    it('should reject formats the server cannot convert', async () => {
+        expect(await packVideoFrame(mockFrame('RGBA', 4, 2))).toBeNull()
+        expect(await packVideoFrame(mockFrame('I420', 3, 2))).toBeNull()
+    })
+})
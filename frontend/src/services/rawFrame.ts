@@ -0,0 +1,20 @@
+// Raw YUV frames for /ws/tracking: [width:u16][height:u16][format:u8] followed by
+// the tightly packed planes. The server turns these into BGR with one cvtColor,
+// skipping the JPEG encode here and the decode there.
+export const RAW_HEADER_SIZE = 5
+const RAW_FORMATS: Record<string, number> = { I420: 1, NV12: 2 }
+
+export async function packVideoFrame(frame: VideoFrame): Promise<ArrayBuffer | null> {
+    const code = frame.format ? RAW_FORMATS[frame.format] : undefined
+    const rect = frame.visibleRect
+    // Only 4:2:0 layouts with even dimensions map onto a plain (h * 3/2, w) buffer
+    if (!code || !rect || rect.width % 2 || rect.height % 2) return null
+
+    const buffer = new ArrayBuffer(RAW_HEADER_SIZE + frame.allocationSize())
+    const header = new DataView(buffer, 0, RAW_HEADER_SIZE)
+    header.setUint16(0, rect.width, true)
+    header.setUint16(2, rect.height, true)
+    header.setUint8(4, code)
+    await frame.copyTo(new Uint8Array(buffer, RAW_HEADER_SIZE))
+    return buffer
+}
@@ -0,0 +1,49 @@
+"""
+Numeric core of gesture recognition, JIT-compiled with Numba when available.
+Kernels take a (21, 2) float32 array of landmark pixel coordinates.
+"""
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    # Numba is optional: fall back to plain Python with the same call signature
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+
+@njit(cache=True, fastmath=True)
+def _dist(xy, a, b):
+    dx = xy[a, 0] - xy[b, 0]
+    dy = xy[a, 1] - xy[b, 1]
+    return np.sqrt(dx * dx + dy * dy)
+
+
+@njit(cache=True, fastmath=True)
+def compute_flags(xy, extend_ratio=1.2, pinch_ratio=0.3):
+    """
+    Finger extension and pinch flags for one hand.
+    A finger is extended if its tip is further from the wrist than its MCP
+    (by extend_ratio); a pinch is thumb-index distance below pinch_ratio of
+    the wrist-to-middle-MCP hand scale.
+    Returns (index_ext, middle_ext, ring_ext, pinky_ext, is_pinch).
+    """
+    # Every landmark's distance from the wrist, computed once
+    offsets = xy - xy[0]
+    d = np.sqrt((offsets * offsets).sum(axis=1))
+
+    hand_scale = d[9]
+    if hand_scale == 0:
+        hand_scale = 1.0  # Prevent div by zero
+
+    index_ext = d[8] > d[5] * extend_ratio
+    middle_ext = d[12] > d[9] * extend_ratio
+    ring_ext = d[16] > d[13] * extend_ratio
+    pinky_ext = d[20] > d[17] * extend_ratio
+
+    is_pinch = _dist(xy, 4, 8) < hand_scale * pinch_ratio
+
+    return index_ext, middle_ext, ring_ext, pinky_ext, is_pinch
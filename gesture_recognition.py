@@ -1,102 +1,85 @@
 import numpy as np
-import math
 from collections import deque
-from config import GESTURE_THRESHOLDS
+from config import GESTURE_THRESHOLDS, Gesture
+from gesture_kernels import compute_flags
 
 class GestureRecognizer:
     def __init__(self):
         self.history = deque(maxlen=20) # For motion detection (Circle)
-        self.gesture_buffer = deque(maxlen=GESTURE_THRESHOLDS['hysteresis_frames'])
+        # Hysteresis: how many consecutive frames the latest candidate has been seen
+        self._last_candidate = Gesture.NONE
+        self._streak = 0
         self.cooldown_counter = 0
-        self.last_gesture = "NONE"
-
-    def _get_distance(self, p1, p2):
-        return math.sqrt((p1['x'] - p2['x'])**2 + (p1['y'] - p2['y'])**2)
+        self.last_gesture = Gesture.NONE
+        
+        # Compile the kernel now rather than on the first tracked frame
+        compute_flags(np.zeros((21, 2), dtype=np.float32))
 
-    def _get_3d_distance(self, p1, p2):
-        # Note: z is relative, x/y are pixels. This is a rough approximation.
-        # Ideally we'd de-normalize x/y or normalize z to aspect ratio.
-        # For now, we use a simple Euclidean check assuming z scale is somewhat comparable after tuning.
-        return math.sqrt((p1['x'] - p2['x'])**2 + (p1['y'] - p2['y'])**2 + (p1['z']*1000 - p2['z']*1000)**2)
+    @staticmethod
+    def _as_xy_array(hand_landmarks):
+        """(21, 2) float32 pixel coords from an ndarray or a list of landmark dicts."""
+        if isinstance(hand_landmarks, np.ndarray):
+            return np.ascontiguousarray(hand_landmarks[:, :2], dtype=np.float32)
+        return np.array([(lm['x'], lm['y']) for lm in hand_landmarks], dtype=np.float32)
 
     def detect_gesture(self, hand_landmarks):
         """
         Detects gesture from a single hand's landmarks.
-        Returns: gesture_name (str)
+        Accepts a (21, 2+) array of pixel coords or a list of landmark dicts.
+        Returns: Gesture
         """
         if self.cooldown_counter > 0:
             self.cooldown_counter -= 1
             return self.last_gesture
 
-        # Shortcuts for landmarks
-        wrist = hand_landmarks[0]
-        thumb_tip = hand_landmarks[4]
-        index_mcp = hand_landmarks[5]
-        index_tip = hand_landmarks[8]
-        middle_mcp = hand_landmarks[9]
-        middle_tip = hand_landmarks[12]
-        ring_tip = hand_landmarks[16]
-        pinky_tip = hand_landmarks[20]
-
-        # Calculate hand scale (Wrist to Middle MCP)
-        hand_scale = self._get_distance(wrist, middle_mcp)
-        if hand_scale == 0: hand_scale = 1 # Prevent div by zero
+        xy = self._as_xy_array(hand_landmarks)
 
         # --- Rule Checks ---
-
-        # 1. Check Finger Extensions
-        # A finger is extended if tip is further from wrist than MCP is.
-        # We can use a ratio threshold.
+        # 1. Finger extensions: tip further from wrist than MCP (1.2x ratio)
+        # 2. Pinch: thumb-index distance under 0.3 of palm size (wrist to middle MCP)
+        index_ext, middle_ext, ring_ext, pinky_ext, is_pinch = compute_flags(xy, 1.2, 0.3)
         
-        def is_extended(tip, mcp):
-            return self._get_distance(wrist, tip) > self._get_distance(wrist, mcp) * 1.2
-
-        index_ext = is_extended(index_tip, index_mcp)
-        middle_ext = is_extended(middle_tip, middle_mcp)
-        ring_ext = is_extended(ring_tip, hand_landmarks[13])
-        pinky_ext = is_extended(pinky_tip, hand_landmarks[17])
-
-        # 2. Pinch Check (Thumb to Index)
-        pinch_dist = self._get_distance(thumb_tip, index_tip)
-        is_pinch = pinch_dist < (hand_scale * 0.3) # Threshold from plan: 0.04 * diagonal? Let's tune. 0.3 of palm size is reasonable.
-        
-        # Plan says: "less than 0.04 times the hand bounding box diagonal distance"
+        # Pinch threshold - plan says: "less than 0.04 times the hand bounding box diagonal distance"
         # Let's approximate bounding box diagonal as 2.5 * hand_scale
         # 0.04 * 2.5 = 0.1. So 0.1 * hand_scale might be too tight.
         # Let's stick to a safe 0.2 for now.
 
         # --- Priority Logic ---
         
-        current_gesture = "UNKNOWN"
+        current_gesture = Gesture.UNKNOWN
 
         # PINCH (Highest Priority)
         if is_pinch:
-            current_gesture = "PINCH"
+            current_gesture = Gesture.PINCH
         
         # FIST (All fingers closed)
         elif not index_ext and not middle_ext and not ring_ext and not pinky_ext:
-            current_gesture = "FIST"
+            current_gesture = Gesture.FIST
 
         # INDEX POINTING (Index open, others closed)
         elif index_ext and not middle_ext and not ring_ext and not pinky_ext:
-            current_gesture = "POINTING"
+            current_gesture = Gesture.POINTING
             
             # Update history for Circle detection
-            self.history.append(index_tip)
+            self.history.append((float(xy[8, 0]), float(xy[8, 1])))
             # TODO: Implement circle detection logic here if needed
             
         # OPEN PALM (All open)
         elif index_ext and middle_ext and ring_ext and pinky_ext:
-            current_gesture = "OPEN_PALM"
+            current_gesture = Gesture.OPEN_PALM
         
         else:
-            current_gesture = "NONE"
+            current_gesture = Gesture.NONE
 
         # --- Hysteresis ---
-        self.gesture_buffer.append(current_gesture)
+        if current_gesture == self._last_candidate:
+            self._streak += 1
+        else:
+            self._last_candidate = current_gesture
+            self._streak = 1
         
-        # Only change state if all frames in buffer match
-        if all(g == current_gesture for g in self.gesture_buffer):
+        # Only change state once the candidate has held for enough frames
+        if self._streak >= GESTURE_THRESHOLDS['hysteresis_frames']:
             if current_gesture != self.last_gesture:
                 self.last_gesture = current_gesture
                 self.cooldown_counter = GESTURE_THRESHOLDS['cooldown_frames']
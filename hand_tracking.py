@@ -1,77 +1,197 @@
+import os
+import time
 import cv2
 import mediapipe as mp
 import numpy as np
-from config import HAND_TRACKING_CONF, SMOOTHING_ALPHA
+from config import (HAND_TRACKING_CONF, SMOOTHING_ALPHA, TRACK_SIZE,
+                    HAND_TRACKING_GPU, HAND_LANDMARKER_MODEL,
+                    HAND_TRACKING_INT8, HAND_LANDMARKER_INT8_MODEL)
+
+# MediaPipe's 21-landmark hand skeleton as (start, end) index pairs
+HAND_CONNECTIONS = np.array([
+    (0, 1), (1, 2), (2, 3), (3, 4),          # Thumb
+    (0, 5), (5, 6), (6, 7), (7, 8),          # Index
+    (5, 9), (9, 10), (10, 11), (11, 12),     # Middle
+    (9, 13), (13, 14), (14, 15), (15, 16),   # Ring
+    (13, 17), (0, 17), (17, 18), (18, 19), (19, 20),  # Pinky and palm
+], dtype=np.intp)
+
+
+def circle_offsets(radius: int, thickness: int) -> np.ndarray:
+    """Pixel (dx, dy) offsets that cv2.circle covers for a circle at the origin."""
+    size = 2 * radius + 2 * max(thickness, 0) + 1
+    c = size // 2
+    patch = np.zeros((size, size), dtype=np.uint8)
+    cv2.circle(patch, (c, c), radius, 255, thickness)
+    ys, xs = np.nonzero(patch)
+    return np.stack([xs - c, ys - c], axis=1)
+
+
+def scatter_marker(frame: np.ndarray, pts: np.ndarray, offsets: np.ndarray, color):
+    """Paint a marker stamp at every point in a single fancy-indexed write."""
+    xy = (pts[:, None, :] + offsets[None, :, :]).reshape(-1, 2)
+    h, w = frame.shape[:2]
+    inside = (xy[:, 0] >= 0) & (xy[:, 0] < w) & (xy[:, 1] >= 0) & (xy[:, 1] < h)
+    xy = xy[inside]
+    frame[xy[:, 1], xy[:, 0]] = color
+
 
 class HandTracker:
-    def __init__(self):
+    def __init__(self, model_complexity=None, track_size=TRACK_SIZE):
         self.mp_hands = mp.solutions.hands
-        self.hands = self.mp_hands.Hands(
-            max_num_hands=HAND_TRACKING_CONF['max_num_hands'],
-            min_detection_confidence=HAND_TRACKING_CONF['min_detection_confidence'],
-            min_tracking_confidence=HAND_TRACKING_CONF['min_tracking_confidence'],
-            model_complexity=HAND_TRACKING_CONF['model_complexity']
-        )
+        self.model_complexity = (HAND_TRACKING_CONF['model_complexity']
+                                 if model_complexity is None else model_complexity)
+        self.track_size = track_size
+        self._pending_complexity = None
+        self._last_timestamp_ms = 0
+        self._rgb = None  # Reused RGB conversion buffer, reallocated if the input size changes
+        
+        # Prefer the GPU HandLandmarker, then the INT8 CPU one; fall back to the
+        # FP32 CPU Solutions graph
+        self.landmarker = self._create_gpu_landmarker() if HAND_TRACKING_GPU else None
+        if self.landmarker is None and HAND_TRACKING_INT8:
+            self.landmarker = self._create_int8_landmarker()
+        self.hands = None if self.landmarker else self._create_hands(self.model_complexity)
 
         
-        # History for smoothing: {hand_id: {landmark_id: (x, y)}}
+        # History for smoothing: {hand_id: (21, 3) float32 array of pixel x, y and relative z}
         # Since MediaPipe doesn't provide persistent IDs across frames easily without extra logic,
         # we will assume index 0 is always the first hand and index 1 is the second for simplicity in Week 1.
         # A more robust ID tracking would be needed for complex interactions, but this suffices for basic smoothing.
         self.prev_landmarks = {} 
 
+    def _create_hands(self, model_complexity):
+        return self.mp_hands.Hands(
+            # Video mode: palm detection only re-runs when landmark tracking is lost
+            static_image_mode=False,
+            max_num_hands=HAND_TRACKING_CONF['max_num_hands'],
+            min_detection_confidence=HAND_TRACKING_CONF['min_detection_confidence'],
+            min_tracking_confidence=HAND_TRACKING_CONF['min_tracking_confidence'],
+            model_complexity=model_complexity
+        )
+
+    def _create_gpu_landmarker(self):
+        """Create a Tasks HandLandmarker on the GPU delegate, or None if unavailable."""
+        return self._create_landmarker(HAND_LANDMARKER_MODEL, mp.tasks.BaseOptions.Delegate.GPU, "GPU")
+
+    def _create_int8_landmarker(self):
+        """Create a Tasks HandLandmarker from the INT8 bundle on the CPU (XNNPACK), or None if unavailable."""
+        return self._create_landmarker(HAND_LANDMARKER_INT8_MODEL, mp.tasks.BaseOptions.Delegate.CPU, "INT8")
+
+    def _create_landmarker(self, model_path, delegate, label):
+        """Create a Tasks HandLandmarker, or None if the model is missing or fails to load."""
+        if not os.path.exists(model_path):
+            return None
+        
+        vision = mp.tasks.vision
+        options = vision.HandLandmarkerOptions(
+            base_options=mp.tasks.BaseOptions(
+                model_asset_path=model_path,
+                delegate=delegate
+            ),
+            # VIDEO mode keeps process_frame synchronous while still tracking across frames
+            running_mode=vision.RunningMode.VIDEO,
+            num_hands=HAND_TRACKING_CONF['max_num_hands'],
+            min_hand_detection_confidence=HAND_TRACKING_CONF['min_detection_confidence'],
+            min_tracking_confidence=HAND_TRACKING_CONF['min_tracking_confidence']
+        )
+        try:
+            return vision.HandLandmarker.create_from_options(options)
+        except Exception as e:
+            print(f"Warning: {label} hand tracking unavailable ({e}), falling back")
+            return None
+
+    def _detect(self, rgb_frame):
+        """Run the active backend; returns [(landmarks, label, score, raw), ...]."""
+        if self.landmarker is not None:
+            # VIDEO mode needs strictly increasing timestamps
+            timestamp_ms = max(int(time.perf_counter() * 1000), self._last_timestamp_ms + 1)
+            self._last_timestamp_ms = timestamp_ms
+            image = mp.Image(image_format=mp.ImageFormat.SRGB, data=rgb_frame)
+            result = self.landmarker.detect_for_video(image, timestamp_ms)
+            return [(hand, handedness[0].category_name, handedness[0].score, hand)
+                    for hand, handedness in zip(result.hand_landmarks, result.handedness)]
+        
+        results = self.hands.process(rgb_frame)
+        if not results.multi_hand_landmarks:
+            return []
+        return [(hand.landmark, handedness.classification[0].label,
+                 handedness.classification[0].score, hand)
+                for hand, handedness in zip(results.multi_hand_landmarks, results.multi_handedness)]
+
+    def set_model_complexity(self, model_complexity):
+        """
+        Switch between the lite (0) and full (1) model.
+        Applied on the next process_frame call, so it's safe from another thread.
+        Only affects the Solutions tracker; the Tasks landmarkers have a single model.
+        """
+        self._pending_complexity = model_complexity
+
+    def _tracking_input(self, frame):
+        """Downscale frame to fit track_size (keeping aspect) for MediaPipe."""
+        if self.track_size is None:
+            return frame
+        h, w = frame.shape[:2]
+        scale = min(self.track_size[0] / w, self.track_size[1] / h)
+        if scale >= 1.0:
+            return frame
+        return cv2.resize(frame, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+
+    def _to_rgb(self, bgr):
+        """Convert to RGB in the reused buffer, returned read-only for MediaPipe."""
+        if self._rgb is None or self._rgb.shape != bgr.shape:
+            self._rgb = np.empty_like(bgr)
+        self._rgb.flags.writeable = True
+        cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB, dst=self._rgb)
+        # Read-only input lets MediaPipe wrap the buffer instead of copying it
+        self._rgb.flags.writeable = False
+        return self._rgb
+
     def process_frame(self, frame):
         """
         Process a BGR frame and return tracked hand data.
+        Landmarks are in the input frame's pixel coordinates, whatever size
+        MediaPipe actually ran at.
         """
+        if self._pending_complexity is not None:
+            if self.hands is not None and self._pending_complexity != self.model_complexity:
+                self.hands.close()
+                self.model_complexity = self._pending_complexity
+                self.hands = self._create_hands(self.model_complexity)
+                self.prev_landmarks = {}
+            self._pending_complexity = None
+        
         h, w, _ = frame.shape
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = self.hands.process(rgb_frame)
+        rgb_frame = self._to_rgb(self._tracking_input(frame))
+        detections = self._detect(rgb_frame)
         
         tracked_hands = []
+        scale = np.array([w, h, 1], dtype=np.float32)
         
-        if results.multi_hand_landmarks:
-            for i, (hand_landmarks, handedness) in enumerate(zip(results.multi_hand_landmarks, results.multi_handedness)):
-                # Get Hand Label (Left/Right)
-                # MediaPipe assumes mirrored image by default? No, it depends on input.
+        if detections:
+            for i, (landmarks, label, score, hand_landmarks) in enumerate(detections):
+                # Hand Label (Left/Right) is stored as given by MediaPipe.
                 # Usually: Label 'Left' means it appears on the left side of the image (which is the user's right hand if mirrored).
-                # We will store the label as given by MediaPipe.
-                label = handedness.classification[0].label
-                score = handedness.classification[0].score
                 
-                # Convert to pixel coordinates and smooth
-                smoothed_landmarks = []
+                # Convert all landmarks to pixel coordinates at once
+                current = np.array([(lm.x, lm.y, lm.z) for lm in landmarks], dtype=np.float32)
+                current *= scale
                 
-                # Initialize history for this hand index if needed
-                if i not in self.prev_landmarks:
-                    self.prev_landmarks[i] = {}
-
-                for idx, lm in enumerate(hand_landmarks.landmark):
-                    px, py = int(lm.x * w), int(lm.y * h)
-                    
-                    # Apply EMA Smoothing
-                    if idx in self.prev_landmarks[i]:
-                        prev_x, prev_y = self.prev_landmarks[i][idx]
-                        smooth_x = int(prev_x * (1 - SMOOTHING_ALPHA) + px * SMOOTHING_ALPHA)
-                        smooth_y = int(prev_y * (1 - SMOOTHING_ALPHA) + py * SMOOTHING_ALPHA)
-                    else:
-                        smooth_x, smooth_y = px, py
-                    
-                    # Update history
-                    self.prev_landmarks[i][idx] = (smooth_x, smooth_y)
-                    
-                    # Store smoothed landmark (including z for depth, not smoothed yet as per plan)
-                    smoothed_landmarks.append({
-                        'x': smooth_x,
-                        'y': smooth_y,
-                        'z': lm.z  # Relative depth
-                    })
+                # Apply EMA Smoothing over the whole (21, 3) array
+                prev = self.prev_landmarks.get(i)
+                if prev is not None and prev.shape == current.shape:
+                    current = prev * (1 - SMOOTHING_ALPHA) + current * SMOOTHING_ALPHA
+                self.prev_landmarks[i] = current
+                
+                # Integer pixel coords for consumers
+                landmarks_xy = current[:, :2].astype(np.int32)
                 
                 tracked_hands.append({
                     'id': i,
                     'label': label,
                     'score': score,
-                    'landmarks': smoothed_landmarks,
+                    'landmarks_np': landmarks_xy,  # (21, 2) int32 pixel coords
+                    'landmarks_xyz': current,  # (21, 3) float32 smoothed pixel x, y and relative z
                     'raw_landmarks': hand_landmarks # Keep raw for debug if needed
                 })
         else:
@@ -79,5 +199,17 @@ class HandTracker:
             
         return tracked_hands
 
+    def reset(self):
+        """
+        Forget smoothing history, e.g. before tracking a different video stream.
+        The MediaPipe graph is kept: its timestamps must keep increasing anyway,
+        and a carried-over hand ROI only seeds the first frame, which falls back
+        to palm detection when the landmark model finds no hand there.
+        """
+        self.prev_landmarks = {}
+
     def close(self):
-        self.hands.close()
+        if self.landmarker is not None:
+            self.landmarker.close()
+        if self.hands is not None:
+            self.hands.close()
@@ -12,6 +12,7 @@ import socket
 import threading
 import time
 import logging
+import urllib.request
 import webbrowser
 from pathlib import Path
 
@@ -43,26 +44,27 @@ def start_server(port: int):
         sys.exit(1)
 
 def wait_for_server(port: int, timeout: int = 30) -> bool:
-    """Wait for server to be ready with health check"""
-    try:
-        import requests
-    except ImportError:
-        logger.warning("requests not installed, skipping health check")
-        time.sleep(5)  # Give server time to start
-        return True
-    
-    start_time = time.time()
+    """Wait for server to accept connections, then confirm with a health check"""
     url = f"http://127.0.0.1:{port}/health"
+    deadline = time.perf_counter() + timeout
     
-    while time.time() - start_time < timeout:
+    while time.perf_counter() < deadline:
+        # A bare TCP connect is the cheapest "is it up yet" probe
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.1):
+                pass
+        except OSError:
+            time.sleep(0.05)
+            continue
+        
         try:
-            response = requests.get(url, timeout=1)
-            if response.status_code == 200:
-                logger.info("Backend ready!")
-                return True
-        except requests.exceptions.RequestException:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == 200:
+                    logger.info("Backend ready!")
+                    return True
+        except OSError:  # URLError/HTTPError included
             pass
-        time.sleep(0.5)
+        time.sleep(0.05)
     
     return False
 
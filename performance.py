@@ -11,36 +11,44 @@ from typing import Optional, Tuple, Dict, Any
 from collections import deque
 import numpy as np
 
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
 class PerformanceProfiler:
     """Performance profiling utility."""
     
     def __init__(self):
         self.profiler = cProfile.Profile()
-        self.stats = None
+        self._ps = None  # Sorted pstats, only rendered to text when asked for
+    
+    def __enter__(self):
+        self.start()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
     
     def start(self):
         """Start profiling."""
         self.profiler.enable()
     
     def stop(self):
-        """Stop profiling and generate stats."""
+        """Stop profiling and collect stats (formatting is deferred)."""
         self.profiler.disable()
-        s = io.StringIO()
-        ps = pstats.Stats(self.profiler, stream=s)
-        ps.sort_stats('cumulative')
-        ps.print_stats(20)  # Top 20 functions
-        self.stats = s.getvalue()
-        return self.stats
+        self._ps = pstats.Stats(self.profiler).sort_stats('cumulative')
     
     def get_top_bottlenecks(self, n=10) -> str:
         """Get top N bottlenecks."""
-        if self.stats is None:
+        if self._ps is None:
             return "No profiling data available"
         
-        lines = self.stats.split('\n')
-        header = '\n'.join(lines[:6])
-        top_n = '\n'.join(lines[6:6+n])
-        return f"{header}\n{top_n}"
+        s = io.StringIO()
+        self._ps.stream = s
+        self._ps.print_stats(n)
+        return s.getvalue()
 
 
 class DirtyRectangleTracker:
@@ -53,10 +61,13 @@ class DirtyRectangleTracker:
     
     def mark_region(self, x1: int, y1: int, x2: int, y2: int):
         """Mark a region as dirty."""
-        x1 = max(0, min(x1, self.canvas_size[0]))
-        y1 = max(0, min(y1, self.canvas_size[1]))
-        x2 = max(0, min(x2, self.canvas_size[0]))
-        y2 = max(0, min(y2, self.canvas_size[1]))
+        # Called per stroke segment: clamp and union with plain comparisons,
+        # which beat both min/max calls and numpy on four scalars
+        cw, ch = self.canvas_size
+        x1 = 0 if x1 < 0 else cw if x1 > cw else x1
+        y1 = 0 if y1 < 0 else ch if y1 > ch else y1
+        x2 = 0 if x2 < 0 else cw if x2 > cw else x2
+        y2 = 0 if y2 < 0 else ch if y2 > ch else y2
         
         if self.dirty_rect is None:
             self.dirty_rect = (x1, y1, x2, y2)
@@ -64,10 +75,10 @@ class DirtyRectangleTracker:
             # Expand to include new region
             dx1, dy1, dx2, dy2 = self.dirty_rect
             self.dirty_rect = (
-                min(dx1, x1),
-                min(dy1, y1),
-                max(dx2, x2),
-                max(dy2, y2)
+                x1 if x1 < dx1 else dx1,
+                y1 if y1 < dy1 else dy1,
+                x2 if x2 > dx2 else dx2,
+                y2 if y2 > dy2 else dy2
             )
     
     def get_dirty_rect(self) -> Optional[Tuple[int, int, int, int]]:
@@ -106,33 +117,41 @@ class DirtyRectangleTracker:
 class GestureCacheEvaluator:
     """Cache computed gesture values to avoid redundant calculations."""
     
-    def __init__(self):
-        self.cache: Dict[str, Any] = {}
-        self.cache_age = 0
+    def __init__(self, max_size: int = 256):
+        # key -> (generation it was set in, value); stale entries are simply
+        # ignored on get instead of wiping the dict every frame
+        self.cache: Dict[str, Tuple[int, Any]] = {}
+        self.generation = 0
         self.max_age = 1  # Recompute every frame
+        self.max_size = max_size
     
     def get(self, key: str) -> Optional[Any]:
         """Get cached value if still valid."""
-        if self.cache_age > self.max_age:
-            self.cache.clear()
-            self.cache_age = 0
+        entry = self.cache.get(key)
+        if entry is None or self.generation - entry[0] > self.max_age:
             return None
-        
-        return self.cache.get(key)
+        return entry[1]
     
     def set(self, key: str, value: Any):
         """Set cached value."""
-        self.cache[key] = value
+        if len(self.cache) >= self.max_size and key not in self.cache:
+            self._prune()
+        self.cache[key] = (self.generation, value)
+    
+    def _prune(self):
+        """Drop expired entries (only runs once the cache has grown to max_size)."""
+        oldest = self.generation - self.max_age
+        self.cache = {k: e for k, e in self.cache.items() if e[0] >= oldest}
     
     def increment_age(self):
-        """Increment cache age."""
-        self.cache_age += 1
+        """Advance to the next generation (frame)."""
+        self.generation += 1
     
     def get_cache_stats(self) -> Dict[str, int]:
         """Get cache statistics."""
         return {
             'size': len(self.cache),
-            'age': self.cache_age
+            'age': self.generation
         }
 
 
@@ -147,13 +166,13 @@ class IntelligentFrameSkipper:
         """
         self.target_interval = 1.0 / target_fps
         self.display_interval = 1.0 / display_fps
-        self.last_process_time = 0
+        self.last_process_time = float('-inf')  # Process the first frame whatever perf_counter's epoch
         self.frame_count = 0
         self.skipped_count = 0
     
     def should_process_gesture(self) -> bool:
         """Check if current frame should be processed for gestures."""
-        current_time = time.time()
+        current_time = time.perf_counter()
         
         if current_time - self.last_process_time >= self.target_interval:
             self.last_process_time = current_time
@@ -174,7 +193,7 @@ class IntelligentFrameSkipper:
         """Get actual gesture processing FPS."""
         if self.frame_count == 0:
             return 0.0
-        elapsed = time.time() - self.last_process_time
+        elapsed = time.perf_counter() - self.last_process_time
         if elapsed == 0:
             return 0.0
         return 1.0 / elapsed
@@ -185,24 +204,24 @@ class FPSCounter:
     
     def __init__(self, window_size: int = 30):
         self.frame_times = deque(maxlen=window_size)
-        self.last_time = time.time()
+        self._frame_time_sum = 0.0  # Running sum of frame_times, kept in step with the deque
+        self.last_time = time.perf_counter()
     
     def tick(self) -> float:
         """Record frame and return current FPS."""
-        current_time = time.time()
+        current_time = time.perf_counter()
         frame_time = current_time - self.last_time
         self.last_time = current_time
         
+        if len(self.frame_times) == self.frame_times.maxlen:
+            self._frame_time_sum -= self.frame_times[0]
         self.frame_times.append(frame_time)
+        self._frame_time_sum += frame_time
         
-        if len(self.frame_times) == 0:
-            return 0.0
-        
-        avg_frame_time = sum(self.frame_times) / len(self.frame_times)
-        if avg_frame_time == 0:
+        if self._frame_time_sum <= 0:
             return 0.0
         
-        return 1.0 / avg_frame_time
+        return len(self.frame_times) / self._frame_time_sum
     
     def get_stats(self) -> Dict[str, float]:
         """Get detailed FPS statistics."""
@@ -223,19 +242,32 @@ class ResourceMonitor:
     
     def __init__(self):
         self.samples = deque(maxlen=100)
+        self._proc = psutil.Process() if psutil is not None else None
+        
+        # torch takes seconds to import, so it's only pulled in once a monitor
+        # exists; CUDA availability is a driver call, so it's checked once too
+        try:
+            import torch
+            self._torch = torch
+            self._cuda = torch.cuda.is_available()
+        except ImportError:
+            self._torch = None
+            self._cuda = False
     
     def sample(self):
-        """Take resource sample."""
-        import psutil
-        import torch
+        """Take resource sample (no-op without psutil)."""
+        if self._proc is None:
+            return
+        
+        torch = self._torch
         
         sample = {
-            'timestamp': time.time(),
+            'timestamp': time.perf_counter(),
             'cpu_percent': psutil.cpu_percent(interval=None),
-            'memory_mb': psutil.Process().memory_info().rss / 1024 / 1024
+            'memory_mb': self._proc.memory_info().rss / 1024 / 1024
         }
         
-        if torch.cuda.is_available():
+        if self._cuda:
             sample['gpu_memory_mb'] = torch.cuda.memory_allocated() / 1024 / 1024
             sample['gpu_memory_reserved_mb'] = torch.cuda.memory_reserved() / 1024 / 1024
         
@@ -290,7 +322,8 @@ class PerformanceOptimizer:
     
     def stop_profiling(self) -> str:
         """Stop profiling and get report."""
-        return self.profiler.stop()
+        self.profiler.stop()
+        return self.profiler.get_top_bottlenecks(20)
     
     def get_optimization_report(self) -> Dict[str, Any]:
         """Get comprehensive optimization report."""
@@ -1,6 +1,33 @@
 import cv2
 import numpy as np
 import os
+import queue
+import shutil
+import subprocess
+import threading
+
+# Green screen: strong G with weak B and R (the asset's screen is flat chroma green)
+GREEN_MIN = 120
+OTHER_MAX = 120
+
+def chroma_key(hand):
+    """Key out the green screen once per asset: (hand, is_hand) with is_hand (h, w, 1) bool."""
+    # Threshold BGR channels directly; no HSV conversion needed for a flat screen
+    b, g, r = hand[..., 0], hand[..., 1], hand[..., 2]
+    is_green = (g > GREEN_MIN) & (r < OTHER_MAX) & (b < OTHER_MAX)
+    is_hand = ~is_green[..., None]
+    return hand, is_hand
+
+def open_ffmpeg(output_path, width, height, fps):
+    """ffmpeg process taking raw BGR frames on stdin, writing H.264; None if ffmpeg isn't installed."""
+    if shutil.which("ffmpeg") is None:
+        return None
+    return subprocess.Popen([
+        "ffmpeg", "-y", "-loglevel", "error",
+        "-f", "rawvideo", "-pix_fmt", "bgr24", "-s", f"{width}x{height}", "-r", str(fps), "-i", "-",
+        "-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p",
+        output_path
+    ], stdin=subprocess.PIPE)
 
 def create_demo_video():
     # Paths
@@ -34,19 +61,51 @@ def create_demo_video():
     
     scale_palm = hand_h / hand_palm.shape[0]
     hand_palm = cv2.resize(hand_palm, (int(hand_palm.shape[1] * scale_palm), hand_h))
+    
+    # The hand pixels never change, only their position, so key them once up front
+    keyed = {
+        'point': chroma_key(hand_point),
+        'palm': chroma_key(hand_palm),
+    }
 
     # Video Writer - Use H.264 for better browser compatibility
-    # Try x264 first, fallback to mp4v if not available
-    try:
-        fourcc = cv2.VideoWriter_fourcc(*'avc1')  # H.264
-    except:
+    # Prefer piping raw frames to ffmpeg (ultrafast x264 in its own process)
+    ffmpeg = open_ffmpeg(output_path, width, height, 30)
+    if ffmpeg is not None:
+        write_frame = lambda frame: ffmpeg.stdin.write(frame.data)
+    else:
+        print("WARNING: ffmpeg not found, encoding with cv2.VideoWriter")
+        # Try x264 first, fallback to mp4v if not available
         try:
-            fourcc = cv2.VideoWriter_fourcc(*'H264')  # Alternative H.264
+            fourcc = cv2.VideoWriter_fourcc(*'avc1')  # H.264
         except:
-            fourcc = cv2.VideoWriter_fourcc(*'mp4v')  # Fallback
-            print("WARNING: H.264 not available, using mp4v (may not work in all browsers)")
+            try:
+                fourcc = cv2.VideoWriter_fourcc(*'H264')  # Alternative H.264
+            except:
+                fourcc = cv2.VideoWriter_fourcc(*'mp4v')  # Fallback
+                print("WARNING: H.264 not available, using mp4v (may not work in all browsers)")
+        
+        out = cv2.VideoWriter(output_path, fourcc, 30.0, (width, height))
+        write_frame = out.write
+    
+    # Encode on a writer thread so compositing the next frame overlaps it
+    write_q = queue.Queue(maxsize=8)
+    write_error = []  # Set by the writer if encoding fails (e.g. ffmpeg exited)
     
-    out = cv2.VideoWriter(output_path, fourcc, 30.0, (width, height))
+    def writer():
+        while True:
+            frame = write_q.get()
+            if frame is None:
+                break
+            if write_error:
+                continue  # Keep draining so the producer never blocks on a full queue
+            try:
+                write_frame(frame)
+            except Exception as e:
+                write_error.append(e)
+    
+    writer_thread = threading.Thread(target=writer, daemon=True)
+    writer_thread.start()
     
     # Animation parameters
     duration = 10 # seconds
@@ -55,36 +114,59 @@ def create_demo_video():
     center_x, center_y = width // 2, height // 2
     radius = 100
     
+    # Precompute the whole hand trajectory
+    ts = np.arange(total_frames) / 30.0
+    xs = np.empty(total_frames, dtype=np.int64)
+    ys = np.empty(total_frames, dtype=np.int64)
+    
+    # Phase 1: Hover (Palm) moving to center
+    m1 = ts < 2.0
+    progress = ts[m1] / 2.0
+    xs[m1] = width * 0.8 * (1 - progress) + (center_x + radius) * progress
+    ys[m1] = height * 0.8 * (1 - progress) + center_y * progress
+    
+    # Phase 2: Draw (Point) in circle
+    pointing = (ts >= 2.0) & (ts < 8.0)
+    angle = (ts[pointing] - 2.0) * 2 # Speed
+    xs[pointing] = center_x + radius * np.cos(angle)
+    ys[pointing] = center_y + radius * np.sin(angle)
+    
+    # Phase 3: Hover (Palm) moving away
+    m3 = ts >= 8.0
+    progress = (ts[m3] - 8.0) / 2.0
+    xs[m3] = (center_x + radius) * (1 - progress) + width * 0.8 * progress
+    ys[m3] = center_y * (1 - progress) + height * 0.8 * progress
+    
+    # Plain ints for slicing in the loop
+    xs, ys, pointing = xs.tolist(), ys.tolist(), pointing.tolist()
+    
     print(f"Generating video to {output_path}...")
     
+    # Recycle a small pool of frames rather than copying bg every frame. A slot
+    # is reused only after the writer is done with it (queued + being written
+    # + being drawn), and only the hand's previous rectangle needs restoring.
+    pool_size = write_q.maxsize + 2
+    frames = [bg.copy() for _ in range(pool_size)]
+    # Both writers take the buffer as-is (ffmpeg via frame.data); a strided or
+    # non-uint8 frame would be copied or rejected on every write
+    assert frames[0].flags['C_CONTIGUOUS'] and frames[0].dtype == np.uint8
+    dirty = [None] * pool_size
+    
     for i in range(total_frames):
-        frame = bg.copy()
-        t = i / 30.0
-        
-        # Determine state
-        if t < 2.0:
-            # Phase 1: Hover (Palm) moving to center
-            current_hand = hand_palm
-            progress = t / 2.0
-            x = int(width * 0.8 * (1 - progress) + (center_x + radius) * progress)
-            y = int(height * 0.8 * (1 - progress) + center_y * progress)
-            
-        elif t < 8.0:
-            # Phase 2: Draw (Point) in circle
-            current_hand = hand_point
-            angle = (t - 2.0) * 2 # Speed
-            x = int(center_x + radius * np.cos(angle))
-            y = int(center_y + radius * np.sin(angle))
-            
-        else:
-            # Phase 3: Hover (Palm) moving away
-            current_hand = hand_palm
-            progress = (t - 8.0) / 2.0
-            x = int((center_x + radius) * (1 - progress) + width * 0.8 * progress)
-            y = int(center_y * (1 - progress) + height * 0.8 * progress)
+        if write_error:
+            break
+        slot = i % pool_size
+        frame = frames[slot]
+        if dirty[slot] is not None:
+            dy1, dy2, dx1, dx2 = dirty[slot]
+            frame[dy1:dy2, dx1:dx2] = bg[dy1:dy2, dx1:dx2]
+            dirty[slot] = None
+        x, y = xs[i], ys[i]
+        current_hand = keyed['point'] if pointing[i] else keyed['palm']
 
         # Overlay hand (Green screen removal)
-        h, w = current_hand.shape[:2]
+        hand, is_hand = current_hand
+        h, w = hand.shape[:2]
         
         # Top-left position
         y1 = y - h // 2
@@ -103,34 +185,26 @@ def create_demo_video():
         ow = x2 - x1
         
         if oh > 0 and ow > 0:
-            hand_crop = current_hand[0:oh, 0:ow] # Simplified crop
-            
-            # Chroma key (remove green)
-            # Green is roughly [0, 255, 0] in BGR? No, in BGR it's [0, 255, 0]
-            # Let's use HSV for better masking
-            hsv = cv2.cvtColor(hand_crop, cv2.COLOR_BGR2HSV)
-            # Green range
-            lower_green = np.array([35, 50, 50])
-            upper_green = np.array([85, 255, 255])
-            mask = cv2.inRange(hsv, lower_green, upper_green)
-            mask_inv = cv2.bitwise_not(mask)
-            
-            # Black-out area in bg
-            roi = frame[y1:y2, x1:x2]
-            bg_bg = cv2.bitwise_and(roi, roi, mask=mask) # Wait, mask is green. We want NOT green.
-            # Actually:
-            # Mask = Green pixels (255)
-            # Mask_inv = Non-green pixels (255) -> Hand
-            
-            img_bg = cv2.bitwise_and(roi, roi, mask=mask) # The background where hand is NOT
-            img_fg = cv2.bitwise_and(hand_crop, hand_crop, mask=mask_inv) # The hand
-            
-            dst = cv2.add(img_bg, img_fg)
-            frame[y1:y2, x1:x2] = dst
+            # Simplified crop; hand pixels are copied over the background in one pass
+            np.copyto(frame[y1:y2, x1:x2], hand[0:oh, 0:ow], where=is_hand[0:oh, 0:ow])
+            dirty[slot] = (y1, y2, x1, x2)
 
-        out.write(frame)
+        write_q.put(frame)
         
-    out.release()
+    write_q.put(None)
+    writer_thread.join()
+    if ffmpeg is not None:
+        try:
+            ffmpeg.stdin.close()
+        except BrokenPipeError:
+            pass  # ffmpeg already exited; reported below
+        ffmpeg.wait()
+    else:
+        out.release()
+    
+    if write_error:
+        exit_info = f" (ffmpeg exited with {ffmpeg.returncode})" if ffmpeg is not None else ""
+        raise RuntimeError(f"Encoding {output_path} failed{exit_info}: {write_error[0]}") from write_error[0]
     print("Video generated!")
 
 if __name__ == "__main__":
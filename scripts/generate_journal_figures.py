@@ -1,10 +1,18 @@
+import matplotlib
+matplotlib.use("Agg")  # Headless, file-only rendering; no GUI backend probing
 import matplotlib.pyplot as plt
 import matplotlib.patches as patches
 import numpy as np
 import os
 
+try:
+    from scipy.signal import lfilter
+except ImportError:
+    lfilter = None
+
 # Ensure output directory exists
 OUTPUT_DIR = "journal_figures"
+FIGURE_DPI = 150  # Ample for print at these figure sizes; 300 quadrupled pixels to rasterize and encode
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 # Set style
@@ -23,9 +31,14 @@ def generate_ema_smoothing():
     
     # EMA Smoothing
     alpha = 0.2
-    smoothed = [raw_input[0]]
-    for i in range(1, len(raw_input)):
-        smoothed.append(alpha * raw_input[i] + (1 - alpha) * smoothed[-1])
+    if lfilter is not None:
+        # y[n] = alpha*x[n] + (1-alpha)*y[n-1] as an IIR filter, seeded so y[0] = x[0]
+        smoothed, _ = lfilter([alpha], [1.0, -(1.0 - alpha)], raw_input,
+                              zi=[raw_input[0] * (1.0 - alpha)])
+    else:
+        smoothed = [raw_input[0]]
+        for i in range(1, len(raw_input)):
+            smoothed.append(alpha * raw_input[i] + (1 - alpha) * smoothed[-1])
     
     plt.figure(figsize=(10, 5), facecolor=colors['bg'])
     ax = plt.gca()
@@ -47,7 +60,7 @@ def generate_ema_smoothing():
                  arrowprops=dict(facecolor='white', shrink=0.05), color='white')
 
     plt.tight_layout()
-    plt.savefig(f"{OUTPUT_DIR}/ema_smoothing.png", dpi=300)
+    plt.savefig(f"{OUTPUT_DIR}/ema_smoothing.png", dpi=FIGURE_DPI)
     plt.close()
     print("Generated ema_smoothing.png")
 
@@ -78,7 +91,7 @@ def generate_latency_comparison():
     plt.text(0.5, 10, "18x Faster", ha='center', color=colors['accent'], fontsize=20, fontweight='bold', rotation=0)
 
     plt.tight_layout()
-    plt.savefig(f"{OUTPUT_DIR}/latency_comparison.png", dpi=300)
+    plt.savefig(f"{OUTPUT_DIR}/latency_comparison.png", dpi=FIGURE_DPI)
     plt.close()
     print("Generated latency_comparison.png")
 
@@ -135,7 +148,7 @@ def generate_architecture_diagram():
 
     plt.title("3-Thread Architecture & Data Flow", color='white', fontsize=16)
     plt.tight_layout()
-    plt.savefig(f"{OUTPUT_DIR}/architecture_diagram.png", dpi=300)
+    plt.savefig(f"{OUTPUT_DIR}/architecture_diagram.png", dpi=FIGURE_DPI)
     plt.close()
     print("Generated architecture_diagram.png")
 
@@ -14,6 +14,7 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from hand_tracking import HandTracker
 from gesture_recognition import GestureRecognizer
+from config import Gesture
 
 def main():
     parser = argparse.ArgumentParser(description="Record test video for gesture validation")
@@ -69,12 +70,12 @@ def main():
         frame = cv2.flip(frame, 1)
         hands_data = tracker.process_frame(frame)
         
-        detected = "NONE"
+        detected = Gesture.NONE
         if hands_data:
-            detected = recognizer.detect_gesture(hands_data[0]['landmarks'])
+            detected = recognizer.detect_gesture(hands_data[0]['landmarks_np'])
             # Draw hand
-            for lm in hands_data[0]['landmarks']:
-                cv2.circle(frame, (lm['x'], lm['y']), 3, (0, 255, 0), -1)
+            for x, y in hands_data[0]['landmarks_np'].tolist():
+                cv2.circle(frame, (x, y), 3, (0, 255, 0), -1)
         
         # UI
         if recording:
@@ -1,6 +1,7 @@
 """Test if MediaPipe can detect hands in the demo video."""
 import cv2
 import mediapipe as mp
+import numpy as np
 
 def test_demo_video():
     mp_hands = mp.solutions.hands.Hands(
@@ -18,23 +19,29 @@ def test_demo_video():
     
     detections = []
     frame_count = 0
+    rgb_buf = None  # Reused for every sampled frame
     
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-        
+    # grab() advances without decoding; only sampled frames are retrieved
+    while cap.grab():
         frame_count += 1
         
         # Process every 30th frame (1 per second)
         if frame_count % 30 != 0:
             continue
+        
+        ret, frame = cap.retrieve()
+        if not ret:
+            break
             
         # Convert BGR to RGB
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        if rgb_buf is None or rgb_buf.shape != frame.shape:
+            rgb_buf = np.empty_like(frame)
+        rgb_buf.flags.writeable = True
+        cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=rgb_buf)
+        rgb_buf.flags.writeable = False
         
         # Detect
-        results = mp_hands.process(rgb_frame)
+        results = mp_hands.process(rgb_buf)
         
         detected = results.multi_hand_landmarks is not None
         detections.append(detected)
@@ -2,12 +2,18 @@ import cv2
 import numpy as np
 import base64
 import json
+import queue
+import struct
+import threading
 import time
 import asyncio
 import logging
+import os
 import uvicorn
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, Optional, Tuple
 from PIL import Image
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
 from fastapi.responses import FileResponse
@@ -20,6 +26,12 @@ from gesture_recognition import GestureRecognizer
 from canvas import GestureCanvas
 from style_transfer import StableDiffusionStyleTransfer, STYLE_PRESETS
 from threading_manager import ThreadingManager, GenerationQueue, GenerationRequest
+from config import Gesture
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -44,7 +56,11 @@ app.add_middleware(
 # Global State
 class ServerState:
     def __init__(self):
-        self.tracker = HandTracker()
+        # Each connection checks out its own HandTracker (smoothing and MediaPipe's
+        # tracking state are per video stream), so connections track concurrently.
+        # Idle trackers wait here; the pool grows only if connections overlap.
+        self.trackers = queue.SimpleQueue()
+        self.trackers.put(HandTracker())
         self.recognizer = GestureRecognizer()
         # Use frontend canvas size (640x480) for coordinate consistency
         self.canvas = GestureCanvas(internal_size=(640, 480), display_size=(640, 480))
@@ -60,122 +76,221 @@ class ServerState:
         
         # State tracking
         self.drawing = False
-        self.last_gesture = "NONE"
+        self.last_gesture = Gesture.NONE
         self.clear_hold_start = None
+        
+        # Frames larger than this are downscaled once, into a per-connection buffer
+        # (HandTracker keeps its own RGB buffer for the MediaPipe input)
+        self.frame_size = (640, 480)
+        
+        # Recognizer and canvas are shared by every connection
+        self.lock = asyncio.Lock()
+        
+        # Decode and tracking run here so they don't block the event loop
+        self.cpu_pool = ThreadPoolExecutor(max_workers=os.cpu_count())
+
+    def checkout_tracker(self) -> HandTracker:
+        try:
+            return self.trackers.get_nowait()
+        except queue.Empty:
+            return HandTracker()
+    
+    def return_tracker(self, tracker: HandTracker):
+        tracker.reset()
+        self.trackers.put(tracker)
 
 state = ServerState()
 
+# Raw YUV frames from the browser: [width:u16][height:u16][format:u8] + tightly packed planes.
+# JPEG frames start with the SOI marker instead, which no valid header can.
+RAW_FRAME_HEADER = struct.Struct('<HHB')
+RAW_FRAME_FORMATS = {1: cv2.COLOR_YUV2BGR_I420, 2: cv2.COLOR_YUV2BGR_NV12}
+
+def decode_frame(data: bytes) -> Optional[np.ndarray]:
+    """Decode a tracking frame (JPEG or raw I420/NV12) to BGR, or None if malformed."""
+    if data[:2] == b'\xff\xd8':
+        return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    
+    if len(data) < RAW_FRAME_HEADER.size:
+        return None
+    w, h, fmt = RAW_FRAME_HEADER.unpack_from(data)
+    code = RAW_FRAME_FORMATS.get(fmt)
+    if code is None or w % 2 or h % 2 or len(data) != RAW_FRAME_HEADER.size + w * h * 3 // 2:
+        return None
+    # Y plane followed by the chroma planes: a zero-copy (h * 3/2, w) view
+    yuv = np.frombuffer(data, np.uint8, offset=RAW_FRAME_HEADER.size).reshape(h * 3 // 2, w)
+    return cv2.cvtColor(yuv, code)
+
+def encode_message(message: Dict) -> bytes:
+    """Serialize a WebSocket message to UTF-8 JSON; orjson writes ndarrays natively."""
+    if orjson is not None:
+        return orjson.dumps(message, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(message, default=lambda o: o.tolist()).encode()
+
 # Models
 class StyleRequest(BaseModel):
     style: str
     image: str  # Base64 encoded image
 
+def track_frame(tracker: HandTracker, data: bytes, resize_buf: np.ndarray):
+    """
+    Decode, downscale (if needed) and track one frame; returns (hands_data, (w, h)),
+    or None if it doesn't decode. Runs on state.cpu_pool as one hop per frame.
+    """
+    frame = decode_frame(data)
+    if frame is None:
+        return None
+    
+    frame_w, frame_h = state.frame_size
+    if frame.shape[1] > frame_w or frame.shape[0] > frame_h:
+        frame = cv2.resize(frame, state.frame_size, dst=resize_buf,
+                           interpolation=cv2.INTER_AREA)
+    # 1. Track Hand
+    return tracker.process_frame(frame), (frame.shape[1], frame.shape[0])
+
+def process_tracking_frame(hands_data: list, frame_size: Tuple[int, int]) -> Dict:
+    """
+    Recognize the gesture and update the shared canvas for one tracked frame;
+    returns the client response. Runs on state.cpu_pool with state.lock held.
+    """
+    # 2. Recognize Gesture
+    gesture = Gesture.NONE
+    index_tip = None
+    landmarks_xyz = []
+    
+    if hands_data:
+        # Use first hand
+        hand = hands_data[0]
+        gesture = state.recognizer.detect_gesture(hand['landmarks_np'])
+        # Sent as one (21, 3) float32 array of pixel x, y and relative z
+        landmarks_xyz = hand['landmarks_xyz']
+        
+        # Get index tip for drawing (landmark 8, int pixel coords)
+        index_tip = tuple(hand['landmarks_np'][8].tolist())
+    
+    # 3. Update Canvas Logic (Backend State)
+    response = {
+        "gesture": gesture.name,
+        "landmarks": landmarks_xyz,
+        "cursor": index_tip,
+        "action": None,
+        "points": None
+    }
+    
+    # Canvas Interaction Logic
+    if index_tip:
+        x, y = index_tip
+        # Map to canvas
+        canvas_x, canvas_y = state.canvas.gesture_to_canvas_coords(x, y, frame_size)
+        
+        if gesture == Gesture.POINTING:
+            if not state.drawing:
+                state.canvas.start_stroke(canvas_x, canvas_y)
+                state.drawing = True
+                response["action"] = "start_stroke"
+                response["points"] = (canvas_x, canvas_y)
+            else:
+                state.canvas.add_point(canvas_x, canvas_y)
+                response["action"] = "draw"
+                response["points"] = (canvas_x, canvas_y)
+            state.clear_hold_start = None
+        
+        elif gesture != Gesture.POINTING and state.drawing:
+            state.canvas.end_stroke()
+            state.drawing = False
+            response["action"] = "end_stroke"
+        
+        # Undo (PINCH)
+        if gesture == Gesture.PINCH and state.last_gesture != Gesture.PINCH:
+            state.canvas.undo()
+            state.clear_hold_start = None
+            response["action"] = "undo"
+        
+        # Clear (OPEN_PALM held)
+        if gesture == Gesture.OPEN_PALM:
+            if state.clear_hold_start is None:
+                state.clear_hold_start = time.time()
+            elif time.time() - state.clear_hold_start > 1.0:
+                state.canvas.clear()
+                state.clear_hold_start = None
+                response["action"] = "clear"
+        else:
+            state.clear_hold_start = None
+    
+    state.last_gesture = gesture
+    return response
+
 # WebSocket for Real-Time Tracking
 @app.websocket("/ws/tracking")
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
     logger.info("Client connected to tracking WebSocket")
+    loop = asyncio.get_running_loop()
+    # A new tracker builds a MediaPipe graph, so don't do that on the event loop
+    tracker = await loop.run_in_executor(state.cpu_pool, state.checkout_tracker)
+    resize_buf = np.empty((state.frame_size[1], state.frame_size[0], 3), dtype=np.uint8)
+    
+    # Latest frame wins: the reader keeps only the newest unprocessed frame, so a
+    # burst of frames never queues up behind a slow one. None means the client left.
+    pending = asyncio.Queue(maxsize=1)
+    
+    def offer(data: Optional[bytes]):
+        if pending.full():
+            pending.get_nowait()  # Drop the stale frame
+        pending.put_nowait(data)
+    
+    async def receive_frames():
+        try:
+            while True:
+                # Receive frame (JPEG or raw YUV bytes in a binary message)
+                offer(await websocket.receive_bytes())
+        except WebSocketDisconnect:
+            logger.info("Client disconnected")
+        except Exception as e:
+            # e.g. a text message (receive_bytes raises KeyError); end the connection
+            logger.error(f"Error receiving frame: {e}")
+            try:
+                await websocket.close(code=1003)  # Unsupported data
+            except RuntimeError:
+                pass  # Socket already closed
+        finally:
+            offer(None)
+    
+    reader = asyncio.create_task(receive_frames())
     
     try:
         while True:
-            # Receive frame (base64)
-            data = await websocket.receive_text()
+            data = await pending.get()
+            if data is None:
+                break
             
-            # Decode frame
             try:
-                # Expecting "data:image/jpeg;base64,..."
-                if "," in data:
-                    header, encoded = data.split(",", 1)
-                else:
-                    encoded = data
-                
-                image_data = base64.b64decode(encoded)
-                np_arr = np.frombuffer(image_data, np.uint8)
-                frame = cv2.imdecode(np_arr, cv2.IMREAD_COLOR)
+                # Decode + track touch no shared state (each connection has its own
+                # tracker), so they run outside the lock, concurrently across clients
+                tracked = await loop.run_in_executor(
+                    state.cpu_pool, track_frame, tracker, data, resize_buf)
                 
-                if frame is None:
+                if tracked is None:
                     continue
-                    
-                # Process frame
-                # 1. Track Hand
-                hands_data = state.tracker.process_frame(frame)
-                
-                # 2. Recognize Gesture
-                gesture = "NONE"
-                index_tip = None
-                landmarks_list = []
+                hands_data, frame_size = tracked
                 
-                if hands_data:
-                    # Use first hand
-                    hand = hands_data[0]
-                    landmarks_list = hand['landmarks']
-                    gesture = state.recognizer.detect_gesture(landmarks_list)
-                    
-                    # Get index tip for drawing (landmark 8)
-                    # landmarks are already in pixels {'x': int, 'y': int, 'z': float}
-                    idx_pt = landmarks_list[8]
-                    index_tip = (idx_pt['x'], idx_pt['y'])
+                async with state.lock:
+                    response = await loop.run_in_executor(
+                        state.cpu_pool, process_tracking_frame, hands_data, frame_size)
                 
-                # 3. Update Canvas Logic (Backend State)
-                response = {
-                    "gesture": gesture,
-                    "landmarks": landmarks_list,
-                    "cursor": index_tip,
-                    "action": None,
-                    "points": None
-                }
-                
-                # Canvas Interaction Logic
-                if index_tip:
-                    x, y = index_tip
-                    # Map to canvas
-                    canvas_x, canvas_y = state.canvas.gesture_to_canvas_coords(x, y, (frame.shape[1], frame.shape[0]))
-                    
-                    if gesture == "POINTING":
-                        if not state.drawing:
-                            state.canvas.start_stroke(canvas_x, canvas_y)
-                            state.drawing = True
-                            response["action"] = "start_stroke"
-                            response["points"] = (canvas_x, canvas_y)
-                        else:
-                            state.canvas.add_point(canvas_x, canvas_y)
-                            response["action"] = "draw"
-                            response["points"] = (canvas_x, canvas_y)
-                        state.clear_hold_start = None
-                    
-                    elif gesture != "POINTING" and state.drawing:
-                        state.canvas.end_stroke()
-                        state.drawing = False
-                        response["action"] = "end_stroke"
-                    
-                    # Undo (PINCH)
-                    if gesture == "PINCH" and state.last_gesture != "PINCH":
-                        state.canvas.undo()
-                        state.clear_hold_start = None
-                        response["action"] = "undo"
-                    
-                    # Clear (OPEN_PALM held)
-                    if gesture == "OPEN_PALM":
-                        if state.clear_hold_start is None:
-                            state.clear_hold_start = time.time()
-                        elif time.time() - state.clear_hold_start > 1.0:
-                            state.canvas.clear()
-                            state.clear_hold_start = None
-                            response["action"] = "clear"
-                    else:
-                        state.clear_hold_start = None
-                
-                state.last_gesture = gesture
-                
-                # Send response
-                await websocket.send_json(response)
+                # Send response (JSON in a binary message)
+                await websocket.send_bytes(encode_message(response))
                 
             except Exception as e:
                 logger.error(f"Error processing frame: {e}")
-                await websocket.send_json({"error": str(e)})
+                await websocket.send_bytes(encode_message({"error": str(e)}))
                 
     except WebSocketDisconnect:
         logger.info("Client disconnected")
+    finally:
+        reader.cancel()
+        await asyncio.gather(reader, return_exceptions=True)
+        state.return_tracker(tracker)
 
 # REST Endpoints
 @app.post("/generate")
@@ -183,10 +298,10 @@ async def generate_image(request: StyleRequest):
     if request.style not in STYLE_PRESETS:
         raise HTTPException(status_code=400, detail="Invalid style")
     
-    # Ensure model is loaded
+    # Normally preloaded at startup; if that's still running this waits for it
+    # off the event loop instead of starting a second load
     if not state.style_transfer.is_loaded:
-        logger.info("Loading SDXL model...")
-        state.style_transfer.load_model()
+        await asyncio.to_thread(state.style_transfer.load_model)
     
     # Decode canvas image from request (Frontend sends current canvas state)
     # OR use backend canvas state? 
@@ -194,7 +309,10 @@ async def generate_image(request: StyleRequest):
     # BUT frontend might have higher res? No, backend is 1024x1024.
     # Let's use backend canvas for consistency.
     
-    canvas_img = state.canvas.get_canvas()
+    # Snapshot pixels and version together so tracking can't change one under the other
+    async with state.lock:
+        canvas_img = state.canvas.snapshot()
+        canvas_version = state.canvas.version
     
     # Create request
     req_id = f"req_{int(time.time()*1000)}"
@@ -202,11 +320,15 @@ async def generate_image(request: StyleRequest):
         request_id=req_id,
         canvas_image=canvas_img,
         style=request.style,
-        timestamp=time.time()
+        timestamp=time.time(),
+        canvas_version=canvas_version
     )
     
+    # Resolved by store_result so /result can long-poll instead of re-requesting
+    pending_results[req_id] = asyncio.get_running_loop().create_future()
     success = state.generation_queue.add_request(gen_req)
     if not success:
+        pending_results.pop(req_id, None)
         raise HTTPException(status_code=503, detail="Queue full")
     
     return {"request_id": req_id, "status": "queued", "position": state.generation_queue.get_queue_size()}
@@ -222,65 +344,134 @@ async def get_status(request_id: str):
     # Since this is async, we can't block.
     # We should have a background task that moves results from queue to a dict.
 
-# Background result poller
-async def result_poller():
+# Background result handoff: a daemon thread blocks on the result queue and hands
+# each result to the event loop the moment it lands (no polling interval)
+def encode_result_image(result) -> Optional[str]:
+    """JPEG + base64 the styled image once, so polling /result never re-encodes it."""
+    if not result.success:
+        return None
+    
+    # Convert PIL Image to numpy array (RGB -> BGR)
+    if isinstance(result.styled_image, Image.Image):
+        img_np = np.array(result.styled_image)
+        img_bgr = cv2.cvtColor(img_np, cv2.COLOR_RGB2BGR)
+    else:
+        img_bgr = result.styled_image
+    
+    _, buffer = cv2.imencode('.jpg', img_bgr)
+    return base64.b64encode(buffer).decode('utf-8')
+
+def store_result(result, image_b64: Optional[str]):
+    # Store result with timestamp for TTL cleanup
+    results_store.put(result.request_id, (result, image_b64))
+    waiter = pending_results.pop(result.request_id, None)
+    if waiter is not None and not waiter.done():
+        waiter.set_result(None)
+    logger.info(f"Result stored: {result.request_id}, success={result.success}")
+
+def drain_results(loop: asyncio.AbstractEventLoop):
+    result_queue = state.threading_manager.result_queue
     while True:
+        result = result_queue.get()
+        # Encode here, off the event loop
         try:
-            if not state.threading_manager.result_queue.empty():
-                result = state.threading_manager.result_queue.get_nowait()
-                # Store result with timestamp for TTL cleanup
-                results_store[result.request_id] = (result, time.time())
-                logger.info(f"Result stored: {result.request_id}, success={result.success}")
-            await asyncio.sleep(0.1)
+            image_b64 = encode_result_image(result)
         except Exception as e:
-            logger.error(f"Poller error: {e}")
-            await asyncio.sleep(1)
+            logger.error(f"Result encode error: {e}")
+            image_b64 = None
+        loop.call_soon_threadsafe(store_result, result, image_b64)
 
-# Cleanup old results (TTL = 5 minutes)
+class TTLStore:
+    """
+    Insertion-ordered store whose entries expire ttl seconds after they were put.
+    Entries are only ever added at the tail, so expiry pops from the head and
+    touches nothing but the expired entries.
+    """
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._items = OrderedDict()  # key -> (value, timestamp)
+    
+    def put(self, key, value):
+        now = time.time()
+        self._items.pop(key, None)  # Re-put moves the key to the tail
+        self._items[key] = (value, now)
+        self.expire(now)
+    
+    def get(self, key):
+        entry = self._items.get(key)
+        return entry[0] if entry is not None else None
+    
+    def __contains__(self, key):
+        return key in self._items
+    
+    def __len__(self):
+        return len(self._items)
+    
+    def expire(self, now: Optional[float] = None) -> list:
+        """Drop entries older than ttl; returns their keys."""
+        cutoff = (time.time() if now is None else now) - self.ttl
+        expired = []
+        while self._items:
+            key, (_value, timestamp) = next(iter(self._items.items()))
+            if timestamp > cutoff:
+                break
+            self._items.popitem(last=False)
+            expired.append(key)
+        return expired
+
+# Cleanup old results (TTL = 5 minutes); puts also expire, this covers idle periods
 async def cleanup_old_results():
     while True:
         try:
-            now = time.time()
-            to_delete = [
-                rid for rid, (res, ts) in results_store.items() 
-                if now - ts > 300  # 5 minute TTL
-            ]
-            for rid in to_delete:
-                del results_store[rid]
+            for rid in results_store.expire():
                 logger.info(f"Cleaned up result {rid}")
         except Exception as e:
             logger.error(f"Cleanup error: {e}")
         await asyncio.sleep(60)  # Run every minute
 
-results_store = {}
+results_store = TTLStore(ttl=300)
+pending_results: Dict[str, asyncio.Future] = {}  # request_id -> set once its result is stored
+RESULT_WAIT_MAX = 30.0  # Longest /result long-poll, in seconds
+
+async def preload_model():
+    """Load SDXL in the background at startup so the first /generate doesn't pay for it."""
+    logger.info("Loading SDXL model...")
+    try:
+        await asyncio.to_thread(state.style_transfer.load_model)
+        logger.info(f"SDXL model loaded in {state.style_transfer.load_time:.1f}s")
+    except Exception as e:
+        logger.error(f"Model preload failed: {e}")
 
 @app.on_event("startup")
 async def startup_event():
-    asyncio.create_task(result_poller())
+    asyncio.create_task(preload_model())
+    threading.Thread(target=drain_results, args=(asyncio.get_running_loop(),),
+                     daemon=True, name="ResultDrain").start()
     asyncio.create_task(cleanup_old_results())
 
 @app.get("/result/{request_id}")
-async def get_result(request_id: str):
+async def get_result(request_id: str, wait: float = 0.0):
+    # Long-poll: hold the request until the result lands or wait seconds pass.
+    # shield() keeps a timed-out caller from cancelling the shared future
+    waiter = pending_results.get(request_id)
+    if waiter is not None and wait > 0:
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=min(wait, RESULT_WAIT_MAX))
+        except asyncio.TimeoutError:
+            pass
+    
     if request_id in results_store:
-        result, _timestamp = results_store[request_id]  # Unpack tuple
-        if result.success:
-            # Convert PIL Image to numpy array (RGB -> BGR)
-            if isinstance(result.styled_image, Image.Image):
-                img_np = np.array(result.styled_image)
-                img_bgr = cv2.cvtColor(img_np, cv2.COLOR_RGB2BGR)
-            else:
-                img_bgr = result.styled_image
-
-            # Encode image
-            _, buffer = cv2.imencode('.jpg', img_bgr)
-            img_str = base64.b64encode(buffer).decode('utf-8')
+        result, img_str = results_store.get(request_id)
+        if result.success and img_str is not None:
             return {"status": "complete", "image": img_str, "time": result.metadata.get('generation_time')}
+        elif result.success:
+            return {"status": "failed", "error": "Result image could not be encoded"}
         else:
             return {"status": "failed", "error": result.error}
     
     # Check if still in queue
     pos = state.generation_queue.get_queue_position(request_id)
-    if pos >= 0:
+    if pos is not None:
         logger.debug(f"Request {request_id} still in queue at position {pos}")
         return {"status": "queued", "position": pos}
     
@@ -294,9 +485,17 @@ async def health_check():
     return {"status": "ok", "model_loaded": state.style_transfer is not None}
 
 # Static File Serving (Production)
+class ImmutableStaticFiles(StaticFiles):
+    """Vite fingerprints asset filenames, so the browser may cache them for good."""
+    async def get_response(self, path: str, scope):
+        response = await super().get_response(path, scope)
+        if response.status_code == 200:
+            response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
+
 if FRONTEND_DIST.exists():
     # Mount assets directory
-    app.mount("/assets", StaticFiles(directory=FRONTEND_DIST / "assets"), name="assets")
+    app.mount("/assets", ImmutableStaticFiles(directory=FRONTEND_DIST / "assets"), name="assets")
     
     # Serve demo.mp4 from public
     if FRONTEND_PUBLIC.exists():
@@ -304,7 +503,9 @@ if FRONTEND_DIST.exists():
         async def serve_demo():
             demo_path = FRONTEND_PUBLIC / "demo.mp4"
             if demo_path.exists():
-                return FileResponse(demo_path, media_type="video/mp4")
+                # The looping demo video is fetched once per day at most, not per replay
+                return FileResponse(demo_path, media_type="video/mp4",
+                                    headers={"Cache-Control": "public, max-age=86400"})
             raise HTTPException(status_code=404, detail="Demo video not found")
     
     # Root route - serve index.html
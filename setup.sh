@@ -21,8 +21,7 @@ echo "Installing desktop app dependencies..."
 echo "  - fastapi"
 echo "  - uvicorn"
 echo "  - websockets"
-echo "  - requests"
-pip3 install --user fastapi 'uvicorn[standard]' websockets requests
+pip3 install --user fastapi 'uvicorn[standard]' websockets
 echo "✓ Desktop app dependencies installed"
 echo ""
 
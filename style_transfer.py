@@ -8,14 +8,23 @@ import torch
 import numpy as np
 from PIL import Image
 import cv2
-from typing import Optional, Tuple, Callable
+from typing import Optional, Tuple, Callable, List
 from dataclasses import dataclass
+from collections import OrderedDict
+import hashlib
+import threading
 import time
 
+from config import (USE_DEEPCACHE, DEEPCACHE_PARAMS, STYLE_CACHE, SD_PRECISION, SD_COMPILE,
+                    SD_SLICING_VRAM_GB, SD_VAE_BF16)
+
 # Lazy imports for diffusers (only when needed)
 _diffusers_loaded = False
 _pipeline = None
 
+# Prepared canvases kept for re-generating an unchanged drawing
+PREPARED_CACHE_SIZE = 4
+
 @dataclass
 class StylePreset:
     name: str
@@ -64,6 +73,22 @@ STYLE_PRESETS = {
 }
 
 
+def perceptual_hash(image: np.ndarray, hash_size: int = 8) -> np.ndarray:
+    """
+    DCT perceptual hash of a BGR image.
+    Returns hash_size^2 bits packed into a uint8 array.
+    """
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(gray, (hash_size * 4, hash_size * 4), interpolation=cv2.INTER_AREA)
+    dct = cv2.dct(small.astype(np.float32))[:hash_size, :hash_size]
+    return np.packbits(dct > np.median(dct))
+
+
+def content_digest(image: np.ndarray) -> bytes:
+    """Exact digest of an image's pixels, to tell true repeats from lookalikes."""
+    return hashlib.blake2b(np.ascontiguousarray(image), digest_size=16).digest()
+
+
 class StableDiffusionStyleTransfer:
     """Manager for Stable Diffusion style transfer operations."""
     
@@ -86,6 +111,27 @@ class StableDiffusionStyleTransfer:
         self.pipeline = None
         self.is_loaded = False
         self.load_time = 0
+        self.precision = SD_PRECISION if self.device == "cuda" else "fp32"
+        self.vae_bf16 = False  # VAE runs in bf16 (set by load_model)
+        
+        # DeepCache helper (None if disabled or unavailable) and whether it is active
+        self.deepcache = None
+        self._deepcache_active = False
+        
+        # Repeat-sketch cache: (phash, style) -> (pixel digest, styled PIL image), LRU ordered
+        self._style_cache: "OrderedDict[Tuple[bytes, str], Tuple[bytes, Image.Image]]" = OrderedDict()
+        
+        # Text-encoder outputs per style; presets are fixed, so each is encoded once per loaded model
+        self._prompt_embeds = {}
+        
+        # Prepared (cropped + resized) canvases keyed by (canvas version, target size), LRU ordered
+        self._prepared_cache: "OrderedDict[Tuple[int, int], Tuple[Image.Image, dict]]" = OrderedDict()
+        
+        # Pinned host staging buffer for canvas uploads (CUDA only), reused while the size holds
+        self._upload_buf = None
+        
+        # load_model may be called from a startup preload and a request at once
+        self._load_lock = threading.Lock()
     
     def load_model(self, progress_callback: Optional[Callable[[str], None]] = None):
         """
@@ -94,9 +140,12 @@ class StableDiffusionStyleTransfer:
         Args:
             progress_callback: Function to call with progress updates
         """
-        if self.is_loaded:
-            return
-        
+        with self._load_lock:
+            if self.is_loaded:
+                return
+            self._load_model(progress_callback)
+    
+    def _load_model(self, progress_callback: Optional[Callable[[str], None]] = None):
         global _diffusers_loaded, _pipeline
         
         start_time = time.time()
@@ -116,20 +165,63 @@ class StableDiffusionStyleTransfer:
         # Load pipeline
         from diffusers import AutoPipelineForImage2Image
         
+        dtype = torch.float16 if self.device == "cuda" else torch.float32
+        if self.precision in ("bf16", "fp8"):
+            # FP8 kernels take bf16 activations; the VAE and text encoders share the
+            # dtype so nothing has to be cast at the component boundaries
+            dtype = torch.bfloat16
+        components = {}
+        if self.precision == "int8":
+            unet = self._load_int8_unet(dtype, progress_callback)
+            if unet is not None:
+                components['unet'] = unet
+            else:
+                self.precision = "fp16"
+        
         self.pipeline = AutoPipelineForImage2Image.from_pretrained(
             self.model_id,
-            torch_dtype=torch.float16 if self.device == "cuda" else torch.float32,
-            variant="fp16" if self.device == "cuda" else None
+            torch_dtype=dtype,
+            variant="fp16" if self.device == "cuda" else None,
+            use_safetensors=True,
+            **components
         )
         
         if self.device == "cuda":
             self.pipeline = self.pipeline.to("cuda")
             
-            # Enable memory optimizations
+            # Enable memory optimizations. Attention runs through PyTorch 2's fused
+            # SDPA kernel; slicing swaps that for a slower chunked loop, so it is
+            # only a fallback for cards too small to hold the unsliced attention
             if progress_callback:
                 progress_callback("Enabling memory optimizations...")
-            self.pipeline.enable_attention_slicing()
+            from diffusers.models.attention_processor import AttnProcessor2_0
+            self.pipeline.unet.set_attn_processor(AttnProcessor2_0())
+            vram_gb = torch.cuda.get_device_properties(0).total_memory / 1024**3
+            if vram_gb < SD_SLICING_VRAM_GB:
+                self.pipeline.enable_attention_slicing()
             self.pipeline.enable_vae_slicing()
+            
+            if self.precision == "fp8" and not self._quantize_fp8_unet(progress_callback):
+                self.precision = "bf16"
+            
+            # bf16/fp8 pipelines already run the VAE in bf16
+            self.vae_bf16 = dtype == torch.bfloat16
+            if SD_VAE_BF16 and not self.vae_bf16:
+                self.vae_bf16 = self._use_bf16_vae(progress_callback)
+            
+            # bitsandbytes layers don't trace cleanly, so int8 UNets stay eager
+            if SD_COMPILE and self.precision != "int8":
+                if progress_callback:
+                    progress_callback("Compiling UNet and VAE decoder...")
+                self.pipeline.unet = torch.compile(
+                    self.pipeline.unet, mode="reduce-overhead", fullgraph=False
+                )
+                self.pipeline.vae.decode = torch.compile(
+                    self.pipeline.vae.decode, mode="reduce-overhead", fullgraph=False
+                )
+        
+        if USE_DEEPCACHE:
+            self._init_deepcache(progress_callback)
         
         self.is_loaded = True
         self.load_time = time.time() - start_time
@@ -137,6 +229,185 @@ class StableDiffusionStyleTransfer:
         if progress_callback:
             progress_callback(f"Model loaded in {self.load_time:.1f}s")
     
+    def _to_device(self, image):
+        """
+        On CUDA, upload RGB image(s) as uint8 through a pinned buffer (a quarter
+        of the bytes of a float upload, and DMA'd asynchronously) and scale them on
+        the GPU; returns a (B, 3, H, W) tensor in [0, 1]. Takes one image or a list
+        of same-size images. Elsewhere returns image as-is.
+        """
+        if self.device != "cuda":
+            return image
+        
+        images = image if isinstance(image, list) else [image]
+        shape = (len(images), images[0].size[1], images[0].size[0], 3)
+        if self._upload_buf is None or tuple(self._upload_buf.shape) != shape:
+            self._upload_buf = torch.empty(shape, dtype=torch.uint8, pin_memory=True)
+        pixels = self._upload_buf.numpy()
+        for i, img in enumerate(images):
+            pixels[i] = np.asarray(img)
+        
+        tensor = self._upload_buf.to(self.device, non_blocking=True)
+        return tensor.permute(0, 3, 1, 2).to(self.pipeline.dtype) / 255.0
+    
+    def warmup(self, size: int = 512):
+        """
+        Run one throwaway inference so CUDA kernels (and torch.compile graphs)
+        are built before the first real request. Bypasses the style cache.
+        """
+        if not self.is_loaded:
+            raise RuntimeError("Model not loaded. Call load_model() first.")
+        
+        start_time = time.time()
+        self.pipeline(
+            prompt="",
+            image=Image.new('RGB', (size, size), (255, 255, 255)),
+            strength=0.5,
+            guidance_scale=0.0,
+            num_inference_steps=2  # int(2 * 0.5) = 1 denoising step
+        )
+        self.clear_cache()
+        return time.time() - start_time
+    
+    def _load_int8_unet(self, dtype, progress_callback: Optional[Callable[[str], None]] = None):
+        """Load the UNet with 8-bit weights, or None if bitsandbytes is unavailable."""
+        try:
+            import bitsandbytes  # noqa: F401
+            from diffusers import BitsAndBytesConfig, UNet2DConditionModel
+        except ImportError:
+            if progress_callback:
+                progress_callback("bitsandbytes not installed, falling back to fp16")
+            return None
+        
+        if progress_callback:
+            progress_callback("Loading 8-bit UNet...")
+        return UNet2DConditionModel.from_pretrained(
+            self.model_id,
+            subfolder="unet",
+            variant="fp16",
+            torch_dtype=dtype,
+            quantization_config=BitsAndBytesConfig(load_in_8bit=True)
+        )
+    
+    def _quantize_fp8_unet(self, progress_callback: Optional[Callable[[str], None]] = None) -> bool:
+        """
+        Quantize the UNet's linear layers in place to FP8 weights with dynamic FP8
+        activations. Needs torchao and compute capability 8.9+; returns False otherwise.
+        """
+        try:
+            from torchao.quantization import quantize_, float8_dynamic_activation_float8_weight
+        except ImportError:
+            if progress_callback:
+                progress_callback("torchao not installed, keeping the bf16 UNet")
+            return False
+        
+        if torch.cuda.get_device_capability() < (8, 9):
+            if progress_callback:
+                progress_callback("GPU has no FP8 support, keeping the bf16 UNet")
+            return False
+        
+        if progress_callback:
+            progress_callback("Quantizing UNet to FP8...")
+        quantize_(self.pipeline.unet, float8_dynamic_activation_float8_weight())
+        return True
+    
+    def _use_bf16_vae(self, progress_callback: Optional[Callable[[str], None]] = None) -> bool:
+        """
+        Run an fp16 pipeline's VAE in bf16. The SDXL VAE overflows in fp16, so
+        diffusers otherwise upcasts it to fp32 on every call (force_upcast); bf16
+        has fp32's range at half the bytes. Inputs are cast on the way in since
+        the pipeline hands the VAE fp16 tensors. Returns False without bf16 support.
+        """
+        if not torch.cuda.is_bf16_supported():
+            return False
+        
+        if progress_callback:
+            progress_callback("Moving VAE to bf16...")
+        vae = self.pipeline.vae.to(torch.bfloat16)
+        vae.register_to_config(force_upcast=False)
+        for name in ('encode', 'decode'):
+            method = getattr(vae, name)
+            setattr(vae, name, lambda x, *args, _method=method, **kwargs:
+                    _method(x.to(torch.bfloat16), *args, **kwargs))
+        return True
+    
+    def _init_deepcache(self, progress_callback: Optional[Callable[[str], None]] = None):
+        """Attach a DeepCache helper to the pipeline (enabled per call in generate)."""
+        try:
+            from DeepCache import DeepCacheSDHelper
+        except ImportError:
+            if progress_callback:
+                progress_callback("DeepCache not installed, running without feature caching")
+            return
+        
+        self.deepcache = DeepCacheSDHelper(pipe=self.pipeline)
+        self.deepcache.set_params(
+            cache_interval=DEEPCACHE_PARAMS['cache_interval'],
+            cache_branch_id=DEEPCACHE_PARAMS['cache_branch_id']
+        )
+    
+    def _set_deepcache(self, num_inference_steps: int):
+        """Enable DeepCache for long schedules, disable it for few-step runs."""
+        if self.deepcache is None:
+            return
+        
+        want = num_inference_steps >= DEEPCACHE_PARAMS['min_steps']
+        if want and not self._deepcache_active:
+            self.deepcache.enable()
+        elif not want and self._deepcache_active:
+            self.deepcache.disable()
+        self._deepcache_active = want
+    
+    def encode_prompt(self, style: str) -> dict:
+        """
+        Get (and cache) the pipeline's prompt embedding kwargs for a style preset.
+        Negative embeddings are None when the preset doesn't use guidance.
+        """
+        embeds = self._prompt_embeds.get(style)
+        if embeds is None:
+            preset = STYLE_PRESETS[style]
+            with torch.no_grad():
+                prompt, negative, pooled, negative_pooled = self.pipeline.encode_prompt(
+                    prompt=preset.prompt,
+                    device=self.device,
+                    num_images_per_prompt=1,
+                    do_classifier_free_guidance=preset.guidance_scale > 1.0,
+                    negative_prompt=preset.negative_prompt,
+                )
+            embeds = {
+                'prompt_embeds': prompt,
+                'negative_prompt_embeds': negative,
+                'pooled_prompt_embeds': pooled,
+                'negative_pooled_prompt_embeds': negative_pooled,
+            }
+            self._prompt_embeds[style] = embeds
+        return embeds
+    
+    def _lookup_cached(self, image: np.ndarray, style: str) -> Optional[Image.Image]:
+        """
+        Find the cached result for exactly this sketch and style. The pHash only
+        narrows the lookup: any edit, however small, must show up in the output,
+        so the pixels have to match too.
+        """
+        key = (perceptual_hash(image, STYLE_CACHE['hash_size']).tobytes(), style)
+        entry = self._style_cache.get(key)
+        if entry is None or entry[0] != content_digest(image):
+            return None
+        self._style_cache.move_to_end(key)
+        return entry[1]
+    
+    def _store_cached(self, image: np.ndarray, style: str, styled: Image.Image):
+        """Insert a cache entry, evicting the least recently used."""
+        key = (perceptual_hash(image, STYLE_CACHE['hash_size']).tobytes(), style)
+        self._style_cache.pop(key, None)
+        self._style_cache[key] = (content_digest(image), styled)
+        while len(self._style_cache) > STYLE_CACHE['size']:
+            self._style_cache.popitem(last=False)
+    
+    def clear_style_cache(self):
+        """Drop all cached styled results."""
+        self._style_cache.clear()
+    
     def smart_crop(self, image: np.ndarray, margin_percent: float = 0.15) -> Tuple[Image.Image, dict]:
         """
         Intelligently crop canvas to content with margin.
@@ -154,16 +425,15 @@ class StableDiffusionStyleTransfer:
         # Threshold to find non-white pixels (content)
         _, thresh = cv2.threshold(gray, 250, 255, cv2.THRESH_BINARY_INV)
         
-        # Find bounding box of content
-        coords = cv2.findNonZero(thresh)
+        # Find bounding box of content. boundingRect reads the mask directly,
+        # without findNonZero's coordinate array of every content pixel
+        x, y, w, h = cv2.boundingRect(thresh)
         
-        if coords is None:
+        if w == 0:
             # No content, return full image
             pil_image = Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
             return pil_image, {'bbox': None, 'margin': margin_percent}
         
-        x, y, w, h = cv2.boundingRect(coords)
-        
         # Add margin
         img_h, img_w = image.shape[:2]
         margin_w = int(w * margin_percent)
@@ -189,17 +459,26 @@ class StableDiffusionStyleTransfer:
         
         return pil_image, crop_info
     
-    def prepare_image(self, image: np.ndarray, target_size: int = 512) -> Tuple[Image.Image, dict]:
+    def prepare_image(self, image: np.ndarray, target_size: int = 512,
+                      canvas_version: Optional[int] = None) -> Tuple[Image.Image, dict]:
         """
         Prepare image for SD: smart crop + resize.
         
         Args:
             image: Input canvas (numpy array, BGR)
             target_size: Target size for SD (512 or 768)
+            canvas_version: GestureCanvas.version of image; when given, an
+                unchanged canvas reuses its earlier preparation
         
         Returns:
             Prepared PIL Image and processing info
         """
+        key = (canvas_version, target_size)
+        if canvas_version is not None and key in self._prepared_cache:
+            self._prepared_cache.move_to_end(key)
+            resized, crop_info = self._prepared_cache[key]
+            return resized, dict(crop_info)
+        
         # Smart crop
         cropped, crop_info = self.smart_crop(image)
         
@@ -222,13 +501,19 @@ class StableDiffusionStyleTransfer:
         
         crop_info['resized_size'] = (new_w, new_h)
         
+        if canvas_version is not None:
+            self._prepared_cache[key] = (resized, dict(crop_info))
+            while len(self._prepared_cache) > PREPARED_CACHE_SIZE:
+                self._prepared_cache.popitem(last=False)
+        
         return resized, crop_info
     
     def generate(self,
                 input_image: np.ndarray,
                 style: str = 'photorealistic',
                 num_inference_steps: int = 4,
-                progress_callback: Optional[Callable[[int, int], None]] = None) -> Tuple[Image.Image, dict]:
+                progress_callback: Optional[Callable[[int, int], None]] = None,
+                canvas_version: Optional[int] = None) -> Tuple[Image.Image, dict]:
         """
         Generate styled image.
         
@@ -237,6 +522,7 @@ class StableDiffusionStyleTransfer:
             style: Style preset name
             num_inference_steps: Number of diffusion steps (1-4 for Turbo)
             progress_callback: Function(current_step, total_steps)
+            canvas_version: GestureCanvas.version of input_image (see prepare_image)
         
         Returns:
             Styled PIL Image and generation metadata
@@ -253,24 +539,40 @@ class StableDiffusionStyleTransfer:
         preset = STYLE_PRESETS[style]
         
         # Prepare image
-        prepared_image, prep_info = self.prepare_image(input_image)
+        prepared_image, prep_info = self.prepare_image(input_image, canvas_version=canvas_version)
+        
+        # Repeat sketch: refine the cached result with only the tail of the schedule
+        cached_image = self._lookup_cached(input_image, style)
+        
+        if cached_image is not None:
+            strength = STYLE_CACHE['refine_strength']
+            # img2img runs int(steps * strength) steps; keep at least one
+            steps = max(num_inference_steps, int(np.ceil(1.0 / strength)))
+            image = cached_image.resize(prepared_image.size, Image.Resampling.LANCZOS)
+        else:
+            strength = preset.strength
+            steps = num_inference_steps
+            image = prepared_image
         
-        # Generate
         # Generate
         kwargs = {
-            'prompt': preset.prompt,
-            'negative_prompt': preset.negative_prompt,
-            'image': prepared_image,
-            'strength': preset.strength,
+            **self.encode_prompt(style),
+            'image': self._to_device(image),
+            'strength': strength,
             'guidance_scale': preset.guidance_scale,
-            'num_inference_steps': num_inference_steps,
+            'num_inference_steps': steps,
         }
         
         if progress_callback:
-            kwargs['callback'] = lambda step, *args: progress_callback(step, num_inference_steps)
+            kwargs['callback'] = lambda step, *args: progress_callback(step, steps)
             kwargs['callback_steps'] = 1
+        
+        self._set_deepcache(int(steps * strength))
             
         result = self.pipeline(**kwargs)
+        # Hits keep the full generation as their base, so repeats don't drift
+        if cached_image is None:
+            self._store_cached(input_image, style, result.images[0])
         
         generation_time = time.time() - start_time
         
@@ -278,13 +580,170 @@ class StableDiffusionStyleTransfer:
             'style': style,
             'preset': preset.name,
             'generation_time': generation_time,
-            'num_steps': num_inference_steps,
+            'num_steps': int(steps * strength),  # Denoising steps img2img actually ran
+            'strength': strength,
+            'deepcache': self._deepcache_active,
+            'cache_hit': cached_image is not None,
             'device': self.device,
+            'precision': self.precision,
             'prep_info': prep_info
         }
         
         return result.images[0], metadata
     
+    def generate_many(self,
+                      input_images: List[np.ndarray],
+                      style: str = 'photorealistic',
+                      num_inference_steps: int = 4,
+                      canvas_versions: Optional[List[Optional[int]]] = None) -> List[Tuple[Image.Image, dict]]:
+        """
+        Generate one style for several canvases in a single pipeline call.
+        
+        Each canvas is prepared as in generate(), then padded with white on the
+        right/bottom to the largest prepared size so the batch shares one latent
+        shape; the padding is cropped back off each result. A single canvas goes
+        through generate(). As with generate_batch(), the style cache isn't
+        consulted for batches, but results are stored in it. canvas_versions
+        (one per canvas, or None) are passed to prepare_image.
+        
+        Returns:
+            (image, metadata) per canvas, in the order given
+        """
+        if not self.is_loaded:
+            raise RuntimeError("Model not loaded. Call load_model() first.")
+        
+        if style not in STYLE_PRESETS:
+            raise ValueError(f"Unknown style: {style}. Available: {list(STYLE_PRESETS.keys())}")
+        
+        if canvas_versions is None:
+            canvas_versions = [None] * len(input_images)
+        
+        if len(input_images) == 1:
+            return [self.generate(input_images[0], style, num_inference_steps,
+                                  canvas_version=canvas_versions[0])]
+        
+        start_time = time.time()
+        preset = STYLE_PRESETS[style]
+        batch_size = len(input_images)
+        
+        prepared = [self.prepare_image(image, canvas_version=version)
+                    for image, version in zip(input_images, canvas_versions)]
+        width = max(image.size[0] for image, _ in prepared)
+        height = max(image.size[1] for image, _ in prepared)
+        
+        padded = []
+        for image, _ in prepared:
+            if image.size != (width, height):
+                canvas = Image.new('RGB', (width, height), (255, 255, 255))
+                canvas.paste(image, (0, 0))
+                image = canvas
+            padded.append(image)
+        
+        self._set_deepcache(int(num_inference_steps * preset.strength))
+        # Repeat the cached style embeddings once per canvas
+        embeds = {
+            key: None if value is None else torch.cat([value] * batch_size)
+            for key, value in self.encode_prompt(style).items()
+        }
+        output = self.pipeline(
+            **embeds,
+            image=self._to_device(padded),
+            strength=preset.strength,
+            guidance_scale=preset.guidance_scale,
+            num_inference_steps=num_inference_steps,
+        )
+        generation_time = time.time() - start_time
+        
+        results = []
+        for input_image, (image, prep_info), styled in zip(input_images, prepared, output.images):
+            if styled.size != image.size:
+                styled = styled.crop((0, 0) + image.size)
+            self._store_cached(input_image, style, styled)
+            results.append((styled, {
+                'style': style,
+                'preset': preset.name,
+                'generation_time': generation_time,
+                'num_steps': int(num_inference_steps * preset.strength),
+                'strength': preset.strength,
+                'batch_size': batch_size,
+                'deepcache': self._deepcache_active,
+                'cache_hit': False,
+                'device': self.device,
+                'precision': self.precision,
+                'prep_info': prep_info
+            }))
+        
+        return results
+    
+    def generate_batch(self,
+                       input_image: np.ndarray,
+                       styles: List[str],
+                       num_inference_steps: int = 4) -> List[Tuple[Image.Image, dict]]:
+        """
+        Generate several styles of the same canvas.
+        
+        The canvas is cropped and prepared once. Styles whose presets share
+        strength and guidance scale run as one batched pipeline call (those
+        are per-call pipeline arguments). The style cache isn't consulted,
+        but results are stored in it.
+        
+        Returns:
+            (image, metadata) per style, in the order given
+        """
+        if not self.is_loaded:
+            raise RuntimeError("Model not loaded. Call load_model() first.")
+        
+        for style in styles:
+            if style not in STYLE_PRESETS:
+                raise ValueError(f"Unknown style: {style}. Available: {list(STYLE_PRESETS.keys())}")
+        
+        prepared_image, prep_info = self.prepare_image(input_image)
+        
+        groups = {}
+        for style in dict.fromkeys(styles):
+            preset = STYLE_PRESETS[style]
+            groups.setdefault((preset.strength, preset.guidance_scale), []).append(style)
+        
+        results = {}
+        for (strength, guidance_scale), group in groups.items():
+            start_time = time.time()
+            presets = [STYLE_PRESETS[style] for style in group]
+            
+            self._set_deepcache(int(num_inference_steps * strength))
+            # Stack the cached per-style embeddings into one batch
+            embeds = [self.encode_prompt(style) for style in group]
+            batched = {
+                key: None if embeds[0][key] is None else torch.cat([e[key] for e in embeds])
+                for key in embeds[0]
+            }
+            output = self.pipeline(
+                **batched,
+                # One init image per prompt; diffusers' implicit repeat is deprecated
+                image=self._to_device([prepared_image] * len(group)),
+                strength=strength,
+                guidance_scale=guidance_scale,
+                num_inference_steps=num_inference_steps,
+            )
+            generation_time = time.time() - start_time
+            
+            for style, preset, image in zip(group, presets, output.images):
+                self._store_cached(input_image, style, image)
+                results[style] = (image, {
+                    'style': style,
+                    'preset': preset.name,
+                    'generation_time': generation_time,
+                    'num_steps': int(num_inference_steps * strength),
+                    'strength': strength,
+                    'batch_size': len(group),
+                    'deepcache': self._deepcache_active,
+                    'cache_hit': False,
+                    'device': self.device,
+                    'precision': self.precision,
+                    'prep_info': prep_info
+                })
+        
+        return [results[style] for style in styles]
+    
     def get_vram_usage(self) -> Optional[dict]:
         """Get current VRAM usage (CUDA only)."""
         if self.device != "cuda" or not torch.cuda.is_available():
@@ -306,6 +765,10 @@ class StableDiffusionStyleTransfer:
     def unload_model(self):
         """Unload model from memory."""
         if self.pipeline is not None:
+            self.deepcache = None
+            self._deepcache_active = False
+            self._prompt_embeds.clear()
+            self._upload_buf = None
             del self.pipeline
             self.pipeline = None
             self.is_loaded = False
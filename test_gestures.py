@@ -2,6 +2,7 @@ import cv2
 import time
 from hand_tracking import HandTracker
 from gesture_recognition import GestureRecognizer
+from config import Gesture
 
 def main():
     tracker = HandTracker()
@@ -30,24 +31,24 @@ def main():
         
         for hand in hands_data:
             # Detect Gesture
-            gesture = recognizer.detect_gesture(hand['landmarks'])
+            gesture = recognizer.detect_gesture(hand['landmarks_np'])
             
             # Visualize
-            wrist = hand['landmarks'][0]
+            wrist_x, wrist_y = hand['landmarks_np'][0].tolist()
             
             # Color based on gesture
             color = (255, 255, 255)
-            if gesture == "PINCH": color = (0, 255, 255) # Yellow
-            elif gesture == "FIST": color = (0, 0, 255) # Red
-            elif gesture == "POINTING": color = (0, 255, 0) # Green
-            elif gesture == "OPEN_PALM": color = (255, 0, 0) # Blue
+            if gesture == Gesture.PINCH: color = (0, 255, 255) # Yellow
+            elif gesture == Gesture.FIST: color = (0, 0, 255) # Red
+            elif gesture == Gesture.POINTING: color = (0, 255, 0) # Green
+            elif gesture == Gesture.OPEN_PALM: color = (255, 0, 0) # Blue
             
-            cv2.putText(frame, f"Gesture: {gesture}", (wrist['x'], wrist['y'] - 40), 
+            cv2.putText(frame, f"Gesture: {gesture}", (wrist_x, wrist_y - 40), 
                         cv2.FONT_HERSHEY_SIMPLEX, 1, color, 2)
             
             # Draw skeleton
-            for lm in hand['landmarks']:
-                cv2.circle(frame, (lm['x'], lm['y']), 3, color, -1)
+            for x, y in hand['landmarks_np'].tolist():
+                cv2.circle(frame, (x, y), 3, color, -1)
 
         # FPS
         curr_time = time.time()
@@ -2,7 +2,6 @@ import asyncio
 import websockets
 import cv2
 import numpy as np
-import base64
 import json
 
 async def test_websocket():
@@ -13,10 +12,9 @@ async def test_websocket():
         # Create a dummy black image
         img = np.zeros((480, 640, 3), dtype=np.uint8)
         _, buffer = cv2.imencode('.jpg', img)
-        img_str = base64.b64encode(buffer).decode('utf-8')
         
-        # Send frame
-        await websocket.send(img_str)
+        # Send frame (raw JPEG bytes, sent as a binary message)
+        await websocket.send(buffer.tobytes())
         print("Sent frame")
         
         # Receive response
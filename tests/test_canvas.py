@@ -26,15 +26,15 @@ class TestCatmullRomSpline(unittest.TestCase):
         self.assertGreater(len(smooth), len(points))
         
         # First and last should match
-        self.assertAlmostEqual(smooth[0].x, 0)
-        self.assertAlmostEqual(smooth[0].y, 0)
-        self.assertAlmostEqual(smooth[-1].x, 100)
-        self.assertAlmostEqual(smooth[-1].y, 100)
+        self.assertAlmostEqual(smooth[0, 0], 0)
+        self.assertAlmostEqual(smooth[0, 1], 0)
+        self.assertAlmostEqual(smooth[-1, 0], 100)
+        self.assertAlmostEqual(smooth[-1, 1], 100)
         
         # Should be roughly linear
         mid = smooth[len(smooth) // 2]
-        self.assertAlmostEqual(mid.x, 50, delta=5)
-        self.assertAlmostEqual(mid.y, 50, delta=5)
+        self.assertAlmostEqual(mid[0], 50, delta=5)
+        self.assertAlmostEqual(mid[1], 50, delta=5)
     
     def test_curve_smoothness(self):
         """Test that curves are smooth (no sharp angles)."""
@@ -45,8 +45,7 @@ class TestCatmullRomSpline(unittest.TestCase):
         self.assertGreater(len(smooth), 10)
         
         # Check that middle point is elevated (curve peaks)
-        y_values = [p.y for p in smooth]
-        max_y = max(y_values)
+        max_y = smooth[:, 1].max()
         self.assertGreater(max_y, 50)  # Should peak higher than midpoint
     
     def test_preserves_endpoints(self):
@@ -54,10 +53,10 @@ class TestCatmullRomSpline(unittest.TestCase):
         points = [Point(10, 20), Point(30, 40), Point(50, 60), Point(70, 80)]
         smooth = CatmullRomSpline.interpolate(points, num_segments=5)
         
-        self.assertAlmostEqual(smooth[0].x, points[0].x)
-        self.assertAlmostEqual(smooth[0].y, points[0].y)
-        self.assertAlmostEqual(smooth[-1].x, points[-1].x)
-        self.assertAlmostEqual(smooth[-1].y, points[-1].y)
+        self.assertAlmostEqual(smooth[0, 0], points[0].x)
+        self.assertAlmostEqual(smooth[0, 1], points[0].y)
+        self.assertAlmostEqual(smooth[-1, 0], points[-1].x)
+        self.assertAlmostEqual(smooth[-1, 1], points[-1].y)
 
 
 class TestCanvasUndoManager(unittest.TestCase):
@@ -84,6 +83,18 @@ class TestCanvasUndoManager(unittest.TestCase):
         self.assertIsNotNone(result)
         np.testing.assert_array_equal(result[10:20, 10:20], 0)  # Should be black again
     
+    def test_bbox_is_tight(self):
+        """Test that the stored bbox exactly covers the changed pixels."""
+        canvas1 = np.full((100, 120, 3), 255, dtype=np.uint8)
+        canvas2 = canvas1.copy()
+        canvas2[15:30, 40:55, 1] = 0  # Single-channel change
+
+        self.manager.save_state(canvas1, canvas2)
+
+        bbox, data = self.manager.history[-1]
+        self.assertEqual(bbox, (40, 15, 55, 30))
+        self.assertEqual(data.shape, (15, 15, 3))
+
     def test_memory_efficiency(self):
         """Test that diff-based storage is efficient."""
         canvas = np.full((1024, 1024, 3), 255, dtype=np.uint8)
@@ -100,6 +111,21 @@ class TestCanvasUndoManager(unittest.TestCase):
         full_canvas_bytes = 1024 * 1024 * 3
         self.assertLess(memory_usage, full_canvas_bytes / 100)  # <1% of full size
     
+    def test_large_regions_compressed(self):
+        """Test big regions are stored compressed and still restore exactly."""
+        canvas = np.full((512, 512, 3), 255, dtype=np.uint8)
+        before = canvas.copy()
+        canvas[50:450, 50:450] = 0
+        canvas[100:400:7, 100:400:5] = 128
+
+        self.manager.save_state(before, canvas)
+        region_bytes = 400 * 400 * 3
+        self.assertLess(self.manager.get_memory_usage(), region_bytes / 10)
+
+        after = canvas.copy()
+        np.testing.assert_array_equal(self.manager.undo(canvas), before)
+        np.testing.assert_array_equal(self.manager.redo(canvas), after)
+
     def test_multiple_undo(self):
         """Test multiple undo operations."""
         canvas = np.full((100, 100, 3), 255, dtype=np.uint8)
@@ -197,6 +223,20 @@ class TestGestureCanvas(unittest.TestCase):
         # Canvas should have changed
         self.assertFalse(np.all(self.canvas.canvas == 255))
     
+    def test_long_stroke_buffer_grows(self):
+        """Test stroke points are kept as an (N, 2) array past the initial capacity."""
+        self.canvas.start_stroke(0, 0)
+        for i in range(1, 600):
+            self.canvas.add_point(i, i % 50)
+        
+        stroke = self.canvas.current_stroke
+        self.assertEqual(stroke.shape, (600, 2))
+        self.assertEqual(stroke.dtype, np.float32)
+        np.testing.assert_array_equal(stroke[599], (599, 599 % 50))
+        
+        self.canvas.end_stroke()
+        self.assertEqual(len(self.canvas.current_stroke), 0)
+    
     def test_clear_canvas(self):
         """Test canvas clear."""
         # Draw something
@@ -231,6 +271,79 @@ class TestGestureCanvas(unittest.TestCase):
         # Should match modified state
         # (Note: might not be pixel-perfect due to smoothing)
         self.assertFalse(np.all(self.canvas.canvas == 255))
+
+    def test_undo_overlapping_strokes(self):
+        """Test undo restores earlier strokes under a new one, including at edges."""
+        self.canvas.start_stroke(0, 500)
+        self.canvas.add_point(1023, 500)
+        self.canvas.end_stroke()
+        first = self.canvas.canvas.copy()
+
+        # Second stroke crosses the first and runs off the top edge
+        self.canvas.start_stroke(500, 800)
+        for y in range(700, -100, -100):
+            self.canvas.add_point(500 + (800 - y) // 4, y)
+        self.canvas.end_stroke()
+
+        self.canvas.undo()
+        np.testing.assert_array_equal(self.canvas.canvas, first)
+
+    def test_display_cache(self):
+        """Test display is only re-rendered after the canvas changes."""
+        canvas = GestureCanvas(display_size=(640, 480))
+        display = canvas.get_display()
+        self.assertEqual(display.shape, (480, 640, 3))
+        np.testing.assert_array_equal(display, 255)
+
+        canvas.start_stroke(100, 100)
+        canvas.add_point(500, 500)
+        self.assertFalse(np.all(canvas.get_display() == 255))
+
+        canvas.clear()
+        np.testing.assert_array_equal(canvas.get_display(), 255)
+
+    def test_version_tracks_changes(self):
+        """Test every pixel change bumps the version and a no-op undo doesn't."""
+        self.canvas.undo()
+        self.assertEqual(self.canvas.version, 0)
+        
+        self.canvas.start_stroke(100, 100)
+        self.canvas.add_point(200, 200)
+        drawing = self.canvas.version
+        self.assertGreater(drawing, 0)
+        
+        self.canvas.end_stroke()
+        self.assertGreater(self.canvas.version, drawing)
+        
+        for op in (self.canvas.undo, self.canvas.redo, self.canvas.clear):
+            before = self.canvas.version
+            op()
+            self.assertGreater(self.canvas.version, before)
+    
+    def test_snapshot_is_copy_on_write(self):
+        """Test a snapshot shares the buffer until the next write, then stays unchanged."""
+        snap = self.canvas.snapshot()
+        self.assertTrue(np.shares_memory(snap, self.canvas.canvas))
+        with self.assertRaises(ValueError):
+            snap[0, 0] = 0
+        
+        self.canvas.start_stroke(100, 100)
+        self.canvas.add_point(200, 200)
+        self.canvas.end_stroke()
+        self.assertFalse(np.shares_memory(snap, self.canvas.canvas))
+        np.testing.assert_array_equal(snap, 255)
+        self.assertFalse(np.all(self.canvas.canvas == 255))
+        
+        # Undo and clear don't reach a snapshot either
+        drawn = self.canvas.snapshot()
+        expected = drawn.copy()
+        self.canvas.undo()
+        np.testing.assert_array_equal(drawn, expected)
+        self.canvas.redo()
+        drawn = self.canvas.snapshot()
+        self.canvas.clear()
+        np.testing.assert_array_equal(drawn, expected)
+        np.testing.assert_array_equal(self.canvas.canvas, 255)
     
     def test_memory_usage(self):
         """Test memory usage tracking."""
@@ -88,6 +88,29 @@ class TestGestureCacheEvaluator(unittest.TestCase):
         value = self.cache.get('key')
         self.assertIsNone(value)
     
+    def test_entry_survives_max_age(self):
+        """Test a value stays valid for max_age frames, then expires on its own."""
+        self.cache.set('key', 'value')
+        self.cache.increment_age()
+        self.assertEqual(self.cache.get('key'), 'value')
+        
+        # A fresh entry set later isn't affected by the old one expiring
+        self.cache.set('other', 'fresh')
+        self.cache.increment_age()
+        self.assertIsNone(self.cache.get('key'))
+        self.assertEqual(self.cache.get('other'), 'fresh')
+    
+    def test_stale_entries_pruned_at_max_size(self):
+        """Test expired entries are dropped once the cache fills up."""
+        cache = GestureCacheEvaluator(max_size=4)
+        for i in range(4):
+            cache.set(f'old{i}', i)
+        for _ in range(3):
+            cache.increment_age()
+        
+        cache.set('new', 'value')
+        self.assertEqual(cache.get_cache_stats()['size'], 1)
+    
     def test_cache_stats(self):
         """Test cache statistics."""
         self.cache.set('key1', 'value1')
@@ -154,6 +177,18 @@ class TestFPSCounter(unittest.TestCase):
         self.assertGreater(stats['avg_fps'], 5)
         self.assertLess(stats['avg_fps'], 100)
     
+    def test_running_average(self):
+        """Test tick() matches the mean over the window once samples roll off."""
+        counter = FPSCounter(window_size=4)
+        
+        for _ in range(10):
+            time.sleep(0.005)
+            fps = counter.tick()
+        
+        self.assertEqual(len(counter.frame_times), 4)
+        expected = len(counter.frame_times) / sum(counter.frame_times)
+        self.assertAlmostEqual(fps, expected, places=6)
+    
     def test_stats_available(self):
         """Test that stats are available."""
         counter = FPSCounter()
@@ -192,6 +227,20 @@ class TestPerformanceOptimizer(unittest.TestCase):
         self.assertIn('skip_ratio', report)
         self.assertIn('dirty_rect_savings', report)
         self.assertIn('cache_stats', report)
+    
+    def test_profiling_report(self):
+        """Test profiler report is produced from both the optimizer and a with-block."""
+        optimizer = PerformanceOptimizer()
+        self.assertEqual(optimizer.profiler.get_top_bottlenecks(),
+                         "No profiling data available")
+        
+        optimizer.start_profiling()
+        sorted(range(1000), reverse=True)
+        self.assertIn("function calls", optimizer.stop_profiling())
+        
+        with optimizer.profiler as profiler:
+            sorted(range(1000), reverse=True)
+        self.assertIn("function calls", profiler.get_top_bottlenecks(5))
 
 
 def run_performance_tests():
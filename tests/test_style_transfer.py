@@ -10,11 +10,21 @@ import os
 import numpy as np
 import cv2
 from PIL import Image
+from unittest.mock import MagicMock, patch
 
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from style_transfer import StableDiffusionStyleTransfer, STYLE_PRESETS
+import torch
+from style_transfer import StableDiffusionStyleTransfer, StylePreset, STYLE_PRESETS
+
+
+def mock_pipeline(**kwargs):
+    """MagicMock SDXL pipeline whose encode_prompt returns (1, ...) embedding tensors."""
+    pipeline = MagicMock(**kwargs)
+    pipeline.encode_prompt.side_effect = lambda **kw: (
+        torch.zeros(1, 77, 8), torch.zeros(1, 77, 8), torch.zeros(1, 8), torch.zeros(1, 8))
+    return pipeline
 
 class TestSmartCrop(unittest.TestCase):
     """Test smart cropping functionality."""
@@ -130,6 +140,21 @@ class TestImagePreparation(unittest.TestCase):
         
         # Resized should match prepared image dimensions
         self.assertEqual(info['resized_size'], prepared.size)
+    
+    def test_unchanged_canvas_version_reuses_preparation(self):
+        """Test a known canvas version skips the crop, and a new version redoes it."""
+        canvas = np.full((1024, 1024, 3), 255, dtype=np.uint8)
+        cv2.rectangle(canvas, (400, 400), (600, 600), (0, 0, 0), -1)
+        
+        first, _ = self.sd.prepare_image(canvas, canvas_version=1)
+        with patch.object(self.sd, 'smart_crop', side_effect=AssertionError("re-cropped")):
+            again, info = self.sd.prepare_image(canvas, canvas_version=1)
+        self.assertIs(again, first)
+        self.assertEqual(info['resized_size'], first.size)
+        
+        cv2.rectangle(canvas, (100, 100), (900, 300), (0, 0, 0), -1)
+        changed, _ = self.sd.prepare_image(canvas, canvas_version=2)
+        self.assertNotEqual(changed.size, first.size)
 
 
 class TestStylePresets(unittest.TestCase):
@@ -195,6 +220,136 @@ class TestModelInterface(unittest.TestCase):
         
         with self.assertRaises(ValueError):
             self.sd.generate(canvas, style='invalid_style_name')
+    
+    def test_warmup(self):
+        """Test warmup requires a loaded model and runs at least one denoising step."""
+        with self.assertRaises(RuntimeError):
+            self.sd.warmup()
+        
+        self.sd.is_loaded = True
+        self.sd.pipeline = MagicMock()
+        self.sd.warmup()
+        
+        kwargs = self.sd.pipeline.call_args.kwargs
+        self.assertGreaterEqual(int(kwargs['num_inference_steps'] * kwargs['strength']), 1)
+    
+    def test_deepcache_only_for_long_schedules(self):
+        """Test DeepCache is toggled by step count, not left on for Turbo runs."""
+        self.sd.is_loaded = True
+        self.sd.pipeline = mock_pipeline(return_value=MagicMock(images=[Image.new('RGB', (8, 8))]))
+        self.sd.deepcache = MagicMock()
+        canvas = np.full((512, 512, 3), 255, dtype=np.uint8)
+        
+        _, metadata = self.sd.generate(canvas, num_inference_steps=4)
+        self.assertFalse(metadata['deepcache'])
+        self.sd.deepcache.enable.assert_not_called()
+        
+        _, metadata = self.sd.generate(canvas, num_inference_steps=20)
+        _, metadata = self.sd.generate(canvas, num_inference_steps=20)
+        self.assertTrue(metadata['deepcache'])
+        self.sd.deepcache.enable.assert_called_once()
+        
+        self.sd.generate(canvas, num_inference_steps=2)
+        self.sd.deepcache.disable.assert_called_once()
+
+    
+    def test_generate_batch_groups_matching_presets(self):
+        """Test styles sharing strength/guidance go through one pipeline call."""
+        self.sd.is_loaded = True
+        self.sd.pipeline = mock_pipeline(side_effect=lambda **kw: MagicMock(
+            images=[Image.new('RGB', (8, 8)) for _ in kw['prompt_embeds']]))
+        canvas = np.full((512, 512, 3), 255, dtype=np.uint8)
+        
+        anime = STYLE_PRESETS['anime']
+        twin = StylePreset('Anime Twin', 'twin prompt', 'twin negative',
+                           anime.strength, anime.guidance_scale)
+        with patch.dict(STYLE_PRESETS, {'anime_twin': twin}):
+            results = self.sd.generate_batch(canvas, ['anime', 'sketch', 'anime_twin'])
+        
+        self.assertEqual(self.sd.pipeline.call_count, 2)
+        self.assertEqual(self.sd.pipeline.call_args_list[0].kwargs['prompt_embeds'].shape[0], 2)
+        self.assertEqual(len(self.sd.pipeline.call_args_list[0].kwargs['image']), 2)
+        self.assertEqual([m['style'] for _, m in results], ['anime', 'sketch', 'anime_twin'])
+        self.assertEqual([m['batch_size'] for _, m in results], [2, 1, 2])
+        
+        with self.assertRaises(ValueError):
+            self.sd.generate_batch(canvas, ['anime', 'invalid_style_name'])
+
+    
+    def test_generate_many_pads_to_one_call(self):
+        """Test canvases of one style share a padded pipeline call and are cropped back."""
+        self.sd.is_loaded = True
+        self.sd.device = 'cpu'  # Keep the padded PIL images visible to the mock
+        self.sd.pipeline = mock_pipeline(side_effect=lambda **kw: MagicMock(
+            images=[Image.new('RGB', kw['image'][0].size) for _ in kw['image']]))
+        square = np.full((512, 512, 3), 255, dtype=np.uint8)
+        wide = np.full((256, 512, 3), 255, dtype=np.uint8)
+        
+        results = self.sd.generate_many([square, wide], style='anime')
+        
+        self.assertEqual(self.sd.pipeline.call_count, 1)
+        kwargs = self.sd.pipeline.call_args.kwargs
+        self.assertEqual(kwargs['prompt_embeds'].shape[0], 2)
+        self.assertEqual({image.size for image in kwargs['image']}, {(512, 512)})
+        self.assertEqual([image.size for image, _ in results], [(512, 512), (512, 256)])
+        self.assertEqual([m['batch_size'] for _, m in results], [2, 2])
+        
+        with self.assertRaises(ValueError):
+            self.sd.generate_many([square, wide], style='invalid_style_name')
+
+
+class TestStyleCache(unittest.TestCase):
+    """Test the repeat-sketch cache."""
+    
+    def setUp(self):
+        self.sd = StableDiffusionStyleTransfer()
+        self.sd.is_loaded = True
+        self.sd.pipeline = mock_pipeline(return_value=MagicMock(images=[Image.new('RGB', (8, 8))]))
+        
+        self.canvas = np.full((512, 512, 3), 255, dtype=np.uint8)
+        cv2.circle(self.canvas, (256, 256), 100, (0, 0, 0), 5)
+    
+    def test_small_edit_is_a_miss(self):
+        """Test only identical sketches hit; a one-dot edit runs the full generation."""
+        edited = self.canvas.copy()
+        cv2.circle(edited, (400, 100), 1, (0, 0, 0), -1)
+        
+        self.sd.generate(self.canvas, style='anime')
+        _, metadata = self.sd.generate(edited, style='anime')
+        self.assertFalse(metadata['cache_hit'])
+        self.assertEqual(self.sd.pipeline.call_args.kwargs['strength'], STYLE_PRESETS['anime'].strength)
+        
+        _, metadata = self.sd.generate(self.canvas.copy(), style='anime')
+        self.assertTrue(metadata['cache_hit'])
+    
+    def test_repeat_refines_cached_result(self):
+        """Test a repeat sketch runs a short img2img tail from the cached image."""
+        _, metadata = self.sd.generate(self.canvas, style='anime')
+        self.assertFalse(metadata['cache_hit'])
+        
+        _, metadata = self.sd.generate(self.canvas, style='anime')
+        self.assertTrue(metadata['cache_hit'])
+        kwargs = self.sd.pipeline.call_args.kwargs
+        self.assertEqual(kwargs['strength'], 0.25)
+        self.assertGreaterEqual(int(kwargs['num_inference_steps'] * kwargs['strength']), 1)
+        # Metadata reports the steps that actually ran
+        self.assertEqual(metadata['strength'], 0.25)
+        self.assertEqual(metadata['num_steps'], int(kwargs['num_inference_steps'] * 0.25))
+        
+        # Same sketch in another style is a miss
+        _, metadata = self.sd.generate(self.canvas, style='sketch')
+        self.assertFalse(metadata['cache_hit'])
+    
+    def test_prompt_encoded_once_per_style(self):
+        """Test the text encoders run once per style, not once per generation."""
+        for _ in range(3):
+            self.sd.generate(self.canvas, style='anime')
+        self.sd.generate(self.canvas, style='sketch')
+        
+        self.assertEqual(self.sd.pipeline.encode_prompt.call_count, 2)
+        kwargs = self.sd.pipeline.call_args.kwargs
+        self.assertNotIn('prompt', kwargs)
+        self.assertIn('pooled_prompt_embeds', kwargs)
 
 
 # Optional: Model Loading Test (only runs if explicitly enabled)
@@ -251,6 +406,7 @@ def run_style_transfer_tests():
     suite.addTests(loader.loadTestsFromTestCase(TestImagePreparation))
     suite.addTests(loader.loadTestsFromTestCase(TestStylePresets))
     suite.addTests(loader.loadTestsFromTestCase(TestModelInterface))
+    suite.addTests(loader.loadTestsFromTestCase(TestStyleCache))
     
     # Optionally run model tests
     suite.addTests(loader.loadTestsFromTestCase(TestModelLoading))
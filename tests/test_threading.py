@@ -17,8 +17,9 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from threading_manager import (
     ThreadSafeGestureState, ThreadSafeFrameBuffer, GenerationQueue,
-    GenerationRequest, GenerationResult, ThreadingManager
+    GenerationRequest, GenerationResult, ThreadingManager, CameraReader
 )
+from config import Gesture
 
 
 class TestThreadSafeGestureState(unittest.TestCase):
@@ -29,10 +30,10 @@ class TestThreadSafeGestureState(unittest.TestCase):
     
     def test_basic_update_and_get(self):
         """Test basic state update and retrieval."""
-        self.state.update(gesture="FIST", hand_detected=True)
+        self.state.update(gesture=Gesture.FIST, hand_detected=True)
         
         state = self.state.get()
-        self.assertEqual(state.gesture, "FIST")
+        self.assertEqual(state.gesture, Gesture.FIST)
         self.assertTrue(state.hand_detected)
     
     def test_concurrent_reads_writes(self):
@@ -93,7 +94,7 @@ class TestThreadSafeGestureState(unittest.TestCase):
     
     def test_state_isolation(self):
         """Test that get() returns copy (no shared references)."""
-        landmarks = [{'x': 100, 'y': 200}]
+        landmarks = np.array([[100, 200]], dtype=np.int32)
         self.state.update(hand_landmarks=landmarks)
         
         state1 = self.state.get()
@@ -101,7 +102,7 @@ class TestThreadSafeGestureState(unittest.TestCase):
         
         # Should be different objects
         self.assertIsNot(state1, state2)
-        if state1.hand_landmarks and state2.hand_landmarks:
+        if state1.hand_landmarks is not None and state2.hand_landmarks is not None:
             self.assertIsNot(state1.hand_landmarks, state2.hand_landmarks)
 
 
@@ -145,6 +146,18 @@ class TestThreadSafeFrameBuffer(unittest.TestCase):
         self.assertIsNotNone(latest)
         np.testing.assert_array_equal(latest, frames[-1])
     
+    def test_frame_id_advances(self):
+        """Test frame_id lets consumers detect frames they've already seen."""
+        self.assertEqual(self.buffer.frame_id, 0)
+        
+        self.buffer.put(np.zeros((10, 10, 3), dtype=np.uint8))
+        seen = self.buffer.frame_id
+        self.assertEqual(self.buffer.get_latest().shape, (10, 10, 3))
+        self.assertEqual(self.buffer.frame_id, seen)
+        
+        self.buffer.put(np.zeros((10, 10, 3), dtype=np.uint8))
+        self.assertGreater(self.buffer.frame_id, seen)
+    
     def test_concurrent_put_get(self):
         """Test concurrent puts and gets."""
         errors = []
@@ -180,6 +193,57 @@ class TestThreadSafeFrameBuffer(unittest.TestCase):
         self.assertEqual(len(errors), 0, f"Errors: {errors}")
 
 
+class TestCameraReader(unittest.TestCase):
+    """Test latest-frame capture thread."""
+    
+    def make_cap(self, n_frames):
+        frames = [np.full((4, 4, 3), i, dtype=np.uint8) for i in range(n_frames)]
+        cap = Mock()
+        cap.grab.side_effect = [True] * n_frames + [False]
+        cap.retrieve.side_effect = [(True, f) for f in frames]
+        return cap, frames
+    
+    def test_decodes_only_when_read(self):
+        """Test frames nobody waits for are grabbed but never decoded."""
+        cap, frames = self.make_cap(5)
+        reader = CameraReader(cap).start()
+        reader._thread.join(timeout=2)
+        
+        self.assertFalse(reader.running)
+        self.assertEqual(cap.grab.call_count, 6)
+        cap.retrieve.assert_not_called()
+        
+        # Camera has ended, so nothing will arrive
+        self.assertEqual(reader.read(timeout=0.1), (0, None))
+    
+    def test_returns_fresh_frame_per_read(self):
+        """Test each read decodes a frame newer than the last one returned."""
+        cap = Mock()
+        cap.grab.return_value = True
+        cap.retrieve.side_effect = lambda: (True, np.zeros((4, 4, 3), dtype=np.uint8))
+        
+        reader = CameraReader(cap).start()
+        first_id, frame = reader.read(timeout=2)
+        self.assertIsNotNone(frame)
+        second_id, frame = reader.read(first_id, timeout=2)
+        self.assertIsNotNone(frame)
+        self.assertGreater(second_id, first_id)
+        reader.stop()
+    
+    def test_stop(self):
+        """Test stop() ends a reader on a camera that never runs out."""
+        cap = Mock()
+        cap.grab.return_value = True
+        cap.retrieve.return_value = (True, np.zeros((4, 4, 3), dtype=np.uint8))
+        
+        reader = CameraReader(cap).start()
+        frame_id, frame = reader.read(timeout=2)
+        self.assertIsNotNone(frame)
+        
+        reader.stop()
+        self.assertFalse(reader._thread.is_alive())
+
+
 class TestGenerationQueue(unittest.TestCase):
     """Test generation request queue."""
     
@@ -289,6 +353,28 @@ class TestGenerationQueue(unittest.TestCase):
         self.assertEqual(self.queue.get_queue_position("req2"), 1)
         self.assertEqual(self.queue.get_queue_size(), 1)
 
+    
+    def test_get_batch(self):
+        """Test a batch drains what is queued, up to max_batch, all at position 0."""
+        for i in range(3):
+            self.queue.add_request(GenerationRequest(
+                request_id=f"req{i}",
+                canvas_image=np.zeros((10, 10, 3)),
+                style="anime",
+                timestamp=time.time()
+            ))
+        
+        batch = self.queue.get_batch(max_batch=2, max_wait=0.0, timeout=0.1)
+        self.assertEqual([r.request_id for r in batch], ["req0", "req1"])
+        self.assertEqual(self.queue.get_queue_position("req0"), 0)
+        self.assertEqual(self.queue.get_queue_position("req1"), 0)
+        self.assertEqual(self.queue.get_queue_position("req2"), 1)
+        self.assertTrue(self.queue.is_processing())
+        
+        self.queue.mark_complete()
+        self.assertEqual(len(self.queue.get_batch(max_batch=4, max_wait=0.01, timeout=0.1)), 1)
+        self.assertEqual(self.queue.get_batch(timeout=0.01), [])
+
 
 class TestThreadingManager(unittest.TestCase):
     """Test threading manager integration."""
@@ -361,6 +447,27 @@ class TestThreadingManager(unittest.TestCase):
         # Should clear after getting
         errors2 = manager.get_errors()
         self.assertEqual(len(errors2), 0)
+    
+    def test_failing_callback_keeps_single_result(self):
+        """Test a raising callback is reported on its own, not as a generation failure."""
+        manager = ThreadingManager()
+        style_transfer = Mock()
+        style_transfer.generate = Mock(return_value=("image", {}))
+        
+        def callback(result):
+            raise RuntimeError("callback failed")
+        
+        manager.generation_queue.add_request(GenerationRequest(
+            request_id="req", canvas_image=np.zeros((4, 4, 3), dtype=np.uint8),
+            style="anime", timestamp=time.time(), callback=callback))
+        manager.start_generation_thread(style_transfer)
+        
+        result = manager.result_queue.get(timeout=2.0)
+        manager.shutdown(timeout=1.0)
+        
+        self.assertTrue(result.success)
+        self.assertTrue(manager.result_queue.empty())
+        self.assertEqual(manager.get_errors(), [("generation_callback", "callback failed")])
 
 
 class TestStressScenarios(unittest.TestCase):
@@ -400,6 +507,7 @@ def run_threading_tests():
     
     suite.addTests(loader.loadTestsFromTestCase(TestThreadSafeGestureState))
     suite.addTests(loader.loadTestsFromTestCase(TestThreadSafeFrameBuffer))
+    suite.addTests(loader.loadTestsFromTestCase(TestCameraReader))
     suite.addTests(loader.loadTestsFromTestCase(TestGenerationQueue))
     suite.addTests(loader.loadTestsFromTestCase(TestThreadingManager))
     suite.addTests(loader.loadTestsFromTestCase(TestStressScenarios))
@@ -13,6 +13,7 @@ import numpy as np
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from gesture_recognition import GestureRecognizer
+from config import Gesture
 
 class TestGestureRecognition(unittest.TestCase):
     def setUp(self):
@@ -114,21 +115,31 @@ class TestGestureRecognition(unittest.TestCase):
         # Run multiple times for hysteresis
         for _ in range(5):
             result = self.recognizer.detect_gesture(landmarks)
-        self.assertEqual(result, "FIST")
+        self.assertEqual(result, Gesture.FIST)
 
     def test_open_palm_detection(self):
         """Test that OPEN_PALM gesture is detected correctly."""
         landmarks = self.create_mock_landmarks("OPEN_PALM")
         for _ in range(5):
             result = self.recognizer.detect_gesture(landmarks)
-        self.assertEqual(result, "OPEN_PALM")
+        self.assertEqual(result, Gesture.OPEN_PALM)
 
     def test_pointing_detection(self):
         """Test that POINTING gesture is detected correctly."""
         landmarks = self.create_mock_landmarks("POINTING")
         for _ in range(5):
             result = self.recognizer.detect_gesture(landmarks)
-        self.assertEqual(result, "POINTING")
+        self.assertEqual(result, Gesture.POINTING)
+
+    def test_array_landmarks(self):
+        """Test that (21, 2) landmark arrays give the same result as dicts."""
+        for gesture in ("FIST", "OPEN_PALM", "POINTING"):
+            recognizer = GestureRecognizer()
+            landmarks = self.create_mock_landmarks(gesture)
+            xy = np.array([(lm['x'], lm['y']) for lm in landmarks], dtype=np.int32)
+            for _ in range(5):
+                result = recognizer.detect_gesture(xy)
+            self.assertEqual(result, Gesture[gesture])
 
     def test_hysteresis(self):
         """Test that hysteresis prevents rapid gesture switching."""
@@ -141,12 +152,12 @@ class TestGestureRecognition(unittest.TestCase):
         
         # Single frame of OPEN_PALM shouldn't switch immediately
         result = self.recognizer.detect_gesture(palm_landmarks)
-        self.assertEqual(result, "FIST", "Hysteresis should prevent immediate switch")
+        self.assertEqual(result, Gesture.FIST, "Hysteresis should prevent immediate switch")
         
         # But sustained OPEN_PALM should eventually switch
         for _ in range(5):
             result = self.recognizer.detect_gesture(palm_landmarks)
-        self.assertEqual(result, "OPEN_PALM", "Sustained gesture should switch")
+        self.assertEqual(result, Gesture.OPEN_PALM, "Sustained gesture should switch")
 
 class TestPerformance(unittest.TestCase):
     def setUp(self):
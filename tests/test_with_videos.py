@@ -16,6 +16,7 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from hand_tracking import HandTracker
 from gesture_recognition import GestureRecognizer
+from config import Gesture
 
 class VideoTestRunner:
     def __init__(self, test_data_dir="test_data/gestures"):
@@ -74,7 +75,7 @@ class VideoTestRunner:
             
             if hands_data:
                 detect_count += 1
-                detected = self.recognizer.detect_gesture(hands_data[0]['landmarks'])
+                detected = self.recognizer.detect_gesture(hands_data[0]['landmarks_np'])
                 
                 if detected == expected_gesture:
                     correct_count += 1
@@ -118,10 +119,10 @@ class VideoTestRunner:
         print("=" * 60)
 
         test_cases = [
-            ("fist.mp4", "FIST"),
-            ("open_palm.mp4", "OPEN_PALM"),
-            ("pointing.mp4", "POINTING"),
-            ("pinch.mp4", "PINCH")
+            ("fist.mp4", Gesture.FIST),
+            ("open_palm.mp4", Gesture.OPEN_PALM),
+            ("pointing.mp4", Gesture.POINTING),
+            ("pinch.mp4", Gesture.PINCH)
         ]
 
         for filename, expected_gesture in test_cases:
@@ -139,8 +140,8 @@ class VideoTestRunner:
             else:
                 self.results["tests_failed"] += 1
             
-            self.results["accuracy"][expected_gesture] = result.get("accuracy", 0)
-            self.results["performance"][expected_gesture] = result.get("avg_fps", 0)
+            self.results["accuracy"][expected_gesture.name] = result.get("accuracy", 0)
+            self.results["performance"][expected_gesture.name] = result.get("avg_fps", 0)
 
         self.print_summary()
         self.save_results()
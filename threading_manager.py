@@ -7,16 +7,18 @@ Implements thread-safe state synchronization and proper resource management.
 import threading
 import queue
 import time
-from typing import Optional, Dict, Any, Callable
+from typing import Optional, Dict, Any, Callable, List
 from dataclasses import dataclass, field
 import numpy as np
 from collections import deque
 
+from config import Gesture, GENERATION_BATCH
+
 @dataclass
 class GestureState:
     """Thread-safe gesture state container."""
-    gesture: str = "NONE"
-    hand_landmarks: Optional[list] = None
+    gesture: Gesture = Gesture.NONE
+    hand_landmarks: Optional[np.ndarray] = None  # (21, 2) int32 pixel coords
     index_tip_pos: Optional[tuple] = None  # (x, y)
     timestamp: float = 0.0
     hand_detected: bool = False
@@ -25,10 +27,11 @@ class GestureState:
 class GenerationRequest:
     """Style transfer generation request."""
     request_id: str
-    canvas_image: np.ndarray
+    canvas_image: np.ndarray  # Read-only snapshot taken when the request was queued
     style: str
     timestamp: float
     callback: Optional[Callable] = None
+    canvas_version: Optional[int] = None  # GestureCanvas.version when queued
 
 @dataclass
 class GenerationResult:
@@ -48,7 +51,7 @@ class ThreadSafeGestureState:
         self._state = GestureState()
         self._lock_hold_times = deque(maxlen=1000)  # Track lock performance
     
-    def update(self, gesture: str = None, hand_landmarks: list = None,
+    def update(self, gesture: Gesture = None, hand_landmarks: np.ndarray = None,
                index_tip_pos: tuple = None, hand_detected: bool = None):
         """Update state with minimal lock hold time."""
         start = time.perf_counter()
@@ -73,7 +76,7 @@ class ThreadSafeGestureState:
             # Deep copy to release lock quickly
             return GestureState(
                 gesture=self._state.gesture,
-                hand_landmarks=self._state.hand_landmarks.copy() if self._state.hand_landmarks else None,
+                hand_landmarks=self._state.hand_landmarks.copy() if self._state.hand_landmarks is not None else None,
                 index_tip_pos=self._state.index_tip_pos,
                 timestamp=self._state.timestamp,
                 hand_detected=self._state.hand_detected
@@ -97,6 +100,7 @@ class ThreadSafeFrameBuffer:
     def __init__(self, maxsize: int = 2):
         self._queue = queue.Queue(maxsize=maxsize)
         self._latest_frame = None
+        self._frame_id = 0  # Bumped on every put, lets consumers skip frames they've seen
         self._lock = threading.Lock()
     
     def put(self, frame: np.ndarray):
@@ -114,6 +118,12 @@ class ThreadSafeFrameBuffer:
         # Also keep latest for immediate access
         with self._lock:
             self._latest_frame = frame
+            self._frame_id += 1
+    
+    @property
+    def frame_id(self) -> int:
+        """Sequence number of the latest frame (0 = none yet)."""
+        return self._frame_id
     
     def get_latest(self) -> Optional[np.ndarray]:
         """Get latest frame (non-blocking)."""
@@ -121,13 +131,82 @@ class ThreadSafeFrameBuffer:
             return self._latest_frame.copy() if self._latest_frame is not None else None
 
 
+class CameraReader:
+    """
+    Capture thread that keeps only the newest frame. Every frame is grabbed so
+    the driver queue stays drained, but one is only decoded when a reader is
+    waiting for it; frames nobody asks for are dropped undecoded.
+    """
+    
+    def __init__(self, cap):
+        self.cap = cap
+        self.frame: Optional[np.ndarray] = None
+        self.frame_id = 0
+        self.lock = threading.Lock()
+        self._new_frame = threading.Condition(self.lock)
+        self._waiting = 0  # Readers blocked in read(), i.e. wanting the next frame
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self.run, daemon=True)
+    
+    def start(self) -> 'CameraReader':
+        self._thread.start()
+        return self
+    
+    def run(self):
+        while not self._stop.is_set():
+            if not self.cap.grab():
+                break
+            if not self._waiting:
+                continue
+            ret, frame = self.cap.retrieve()
+            if not ret:
+                continue
+            with self._new_frame:
+                self.frame = frame
+                self.frame_id += 1
+                self._new_frame.notify_all()
+        
+        # Camera closed or stop requested: wake any waiting reader
+        self._stop.set()
+        with self._new_frame:
+            self._new_frame.notify_all()
+    
+    def read(self, last_id: int = 0, timeout: float = 1.0):
+        """Wait for a frame newer than last_id.
+        
+        Returns (frame_id, frame), or (last_id, None) on timeout or once the
+        camera has stopped. Each retrieve allocates a new array, so the frame
+        is returned without copying; callers must not draw on it.
+        """
+        with self._new_frame:
+            self._waiting += 1
+            try:
+                self._new_frame.wait_for(
+                    lambda: self.frame_id > last_id or self._stop.is_set(), timeout
+                )
+            finally:
+                self._waiting -= 1
+            if self.frame_id > last_id:
+                return self.frame_id, self.frame
+            return last_id, None
+    
+    @property
+    def running(self) -> bool:
+        return not self._stop.is_set()
+    
+    def stop(self, timeout: float = 1.0):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout=timeout)
+
+
 class GenerationQueue:
     """Thread-safe generation request queue with VRAM management."""
     
     def __init__(self, max_queue_size: int = 5):
         self._queue = queue.Queue(maxsize=max_queue_size)
         self._lock = threading.Lock()
-        self._current_request: Optional[GenerationRequest] = None
+        self._current_requests: List[GenerationRequest] = []
         self._queue_position = {}  # request_id -> position
     
     def add_request(self, request: GenerationRequest) -> bool:
@@ -144,16 +223,42 @@ class GenerationQueue:
         try:
             request = self._queue.get(timeout=timeout)
             with self._lock:
-                self._current_request = request
+                self._current_requests = [request]
             self._update_positions()
             return request
         except queue.Empty:
             return None
     
+    def get_batch(self, max_batch: int = GENERATION_BATCH['max_batch'],
+                  max_wait: float = GENERATION_BATCH['max_wait'],
+                  timeout: float = 0.1) -> List[GenerationRequest]:
+        """
+        Get up to max_batch requests. Blocks (with timeout) for the first, then
+        waits at most max_wait seconds for more. Empty list if nothing arrived.
+        """
+        try:
+            batch = [self._queue.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        
+        deadline = time.monotonic() + max_wait
+        while len(batch) < max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0
+                             else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        
+        with self._lock:
+            self._current_requests = batch
+        self._update_positions()
+        return batch
+    
     def mark_complete(self):
-        """Mark current request as complete."""
+        """Mark current request(s) as complete."""
         with self._lock:
-            self._current_request = None
+            self._current_requests = []
     
     def get_queue_position(self, request_id: str) -> Optional[int]:
         """Get position of request in queue (0 = currently processing)."""
@@ -166,16 +271,16 @@ class GenerationQueue:
     def is_processing(self) -> bool:
         """Check if currently processing a request."""
         with self._lock:
-            return self._current_request is not None
+            return bool(self._current_requests)
     
     def _update_positions(self):
         """Update queue position tracking."""
         with self._lock:
             self._queue_position.clear()
             
-            # Current request is position 0
-            if self._current_request:
-                self._queue_position[self._current_request.request_id] = 0
+            # Requests being generated are position 0
+            for req in self._current_requests:
+                self._queue_position[req.request_id] = 0
             
             # Queue items are positions 1, 2, 3...
             items = list(self._queue.queue)
@@ -193,6 +298,9 @@ class ThreadingManager:
         self.generation_queue = GenerationQueue()
         self.result_queue = queue.Queue()
         
+        # Set by the tracking thread once a frame and its gesture state are published
+        self.frame_ready = threading.Event()
+        
         # Thread references
         self.hand_tracking_thread: Optional[threading.Thread] = None
         self.generation_thread: Optional[threading.Thread] = None
@@ -241,22 +349,24 @@ class ThreadingManager:
                     
                     if hands_data:
                         hand = hands_data[0]
-                        gesture = gesture_recognizer.detect_gesture(hand['landmarks'])
-                        index_tip = hand['landmarks'][8]
+                        gesture = gesture_recognizer.detect_gesture(hand['landmarks_np'])
+                        index_tip = hand['landmarks_np'][8].tolist()
                         
                         self.gesture_state.update(
                             gesture=gesture,
-                            hand_landmarks=hand['landmarks'],
-                            index_tip_pos=(index_tip['x'], index_tip['y']),
+                            hand_landmarks=hand['landmarks_np'],
+                            index_tip_pos=tuple(index_tip),
                             hand_detected=True
                         )
                     else:
                         self.gesture_state.update(
-                            gesture="NONE",
+                            gesture=Gesture.NONE,
                             hand_landmarks=None,
                             index_tip_pos=None,
                             hand_detected=False
                         )
+                    
+                    self.frame_ready.set()
             
             except Exception as e:
                 self._errors.put(("hand_tracking", str(e)))
@@ -268,49 +378,70 @@ class ThreadingManager:
         self.hand_tracking_thread.start()
     
     def start_generation_thread(self, style_transfer_system):
-        """Start style transfer generation thread."""
+        """
+        Start style transfer generation thread. Requests that arrive together are
+        drained as one batch; those sharing a style run through a single pipeline call.
+        """
+        def publish(request, styled_image, metadata, error=None):
+            result = GenerationResult(
+                request_id=request.request_id,
+                styled_image=styled_image,
+                metadata=metadata,
+                success=error is None,
+                error=error
+            )
+            self.result_queue.put(result)
+            
+            # Callback if provided; a failing callback is reported on its own and
+            # doesn't turn a published result into a generation error
+            if error is None and request.callback:
+                try:
+                    request.callback(result)
+                except Exception as e:
+                    self._errors.put(("generation_callback", str(e)))
+        
         def generation_loop():
             try:
                 while not self._shutdown.is_set():
-                    # Get next request
-                    request = self.generation_queue.get_request(timeout=0.5)
+                    # Get next batch of requests
+                    requests = self.generation_queue.get_batch(timeout=0.5)
                     
-                    if request is None:
+                    if not requests:
                         continue
                     
+                    by_style = {}
+                    for request in requests:
+                        by_style.setdefault(request.style, []).append(request)
+                    
                     try:
-                        # Generate
-                        styled_image, metadata = style_transfer_system.generate(
-                            request.canvas_image,
-                            style=request.style,
-                            num_inference_steps=4
-                        )
+                        for style, group in by_style.items():
+                            try:
+                                # Generate
+                                if len(group) == 1:
+                                    outputs = [style_transfer_system.generate(
+                                        group[0].canvas_image,
+                                        style=style,
+                                        num_inference_steps=4,
+                                        canvas_version=group[0].canvas_version
+                                    )]
+                                else:
+                                    outputs = style_transfer_system.generate_many(
+                                        [request.canvas_image for request in group],
+                                        style=style,
+                                        num_inference_steps=4,
+                                        canvas_versions=[request.canvas_version for request in group]
+                                    )
+                            
+                            except Exception as e:
+                                for request in group:
+                                    publish(request, None, {}, error=str(e))
+                                continue
+                            
+                            for request, (styled_image, metadata) in zip(group, outputs):
+                                publish(request, styled_image, metadata)
                         
                         # Clear VRAM cache
                         style_transfer_system.clear_cache()
-                        
-                        # Queue result
-                        result = GenerationResult(
-                            request_id=request.request_id,
-                            styled_image=styled_image,
-                            metadata=metadata,
-                            success=True
-                        )
-                        self.result_queue.put(result)
-                        
-                        # Callback if provided
-                        if request.callback:
-                            request.callback(result)
-                    
-                    except Exception as e:
-                        result = GenerationResult(
-                            request_id=request.request_id,
-                            styled_image=None,
-                            metadata={},
-                            success=False,
-                            error=str(e)
-                        )
-                        self.result_queue.put(result)
                     
                     finally:
                         self.generation_queue.mark_complete()
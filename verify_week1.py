@@ -4,6 +4,7 @@ import sys
 import subprocess
 from hand_tracking import HandTracker
 from gesture_recognition import GestureRecognizer
+from config import Gesture
 
 import argparse
 
@@ -76,7 +77,7 @@ def main():
         cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
         cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
 
-    challenges = ["OPEN_PALM", "FIST", "POINTING", "PINCH"]
+    challenges = [Gesture.OPEN_PALM, Gesture.FIST, Gesture.POINTING, Gesture.PINCH]
     current_challenge_idx = 0
     challenge_start_time = time.time()
     results = {}
@@ -103,13 +104,13 @@ def main():
         h, w, _ = frame.shape
 
         hands_data = tracker.process_frame(frame)
-        detected_gesture = "NONE"
+        detected_gesture = Gesture.NONE
         
         if hands_data:
-            detected_gesture = recognizer.detect_gesture(hands_data[0]['landmarks'])
+            detected_gesture = recognizer.detect_gesture(hands_data[0]['landmarks_np'])
             # Draw skeleton
-            for lm in hands_data[0]['landmarks']:
-                cv2.circle(frame, (lm['x'], lm['y']), 3, (0, 255, 0), -1)
+            for x, y in hands_data[0]['landmarks_np'].tolist():
+                cv2.circle(frame, (x, y), 3, (0, 255, 0), -1)
 
         # UI Logic
         if state == "INSTRUCTION":
@@ -130,7 +131,7 @@ def main():
             if detected_gesture == target:
                 state = "SUCCESS"
                 success_timer = time.time()
-                results[target] = "PASS"
+                results[target.name] = "PASS"
 
         elif state == "SUCCESS":
             target = challenges[current_challenge_idx]
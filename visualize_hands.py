@@ -41,23 +41,24 @@ def main():
             
             # Draw connections
             # MediaPipe connections are tuples of indices
+            points = hand['landmarks_np'].tolist()
             for connection in mp.solutions.hands.HAND_CONNECTIONS:
                 start_idx = connection[0]
                 end_idx = connection[1]
                 
-                start_pt = (hand['landmarks'][start_idx]['x'], hand['landmarks'][start_idx]['y'])
-                end_pt = (hand['landmarks'][end_idx]['x'], hand['landmarks'][end_idx]['y'])
+                start_pt = tuple(points[start_idx])
+                end_pt = tuple(points[end_idx])
                 
                 cv2.line(frame, start_pt, end_pt, (0, 255, 0), 2)
             
             # Draw points
-            for lm in hand['landmarks']:
-                cv2.circle(frame, (lm['x'], lm['y']), 4, (0, 0, 255), -1)
+            for x, y in points:
+                cv2.circle(frame, (x, y), 4, (0, 0, 255), -1)
             
             # Draw Label
-            wrist = hand['landmarks'][0]
+            wrist_x, wrist_y = points[0]
             cv2.putText(frame, f"{hand['label']} ({int(hand['score']*100)}%)", 
-                        (wrist['x'], wrist['y'] - 20), 
+                        (wrist_x, wrist_y - 20), 
                         cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)
 
         # FPS Calculation